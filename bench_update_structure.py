@@ -0,0 +1,184 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import update_structure
+
+DEFAULT_SIZES = (10, 1000, 50000)
+DEFAULT_CLUSTERS = 100_000
+# Metrics compared against the baseline; all of them are "lower is better".
+# /proc/self/io only counts read and write calls, hence the metric's name
+COMPARED = ('wall_s', 'read_write_syscalls', 'bytes_written', 'peak_rss_kb')
+# How much a metric must grow, besides the tolerance, to count: 30% of a few
+# milliseconds or kilobytes is noise rather than a regression
+FLOORS = {'wall_s': 0.01, 'read_write_syscalls': 100, 'bytes_written': 64 * 1024, 'peak_rss_kb': 2048}
+TMPFS = '/dev/shm'
+
+
+def read_proc_io():
+    """Per-process I/O counters from /proc (Linux only)"""
+    try:
+        with open('/proc/self/io', encoding='ascii') as file:
+            return {key: int(value) for key, value in (line.split(': ') for line in file)}
+    except OSError:
+        return None
+
+def scaffold_outputs(count):
+    """The registry outputs, padded with extra component files up to count"""
+    outputs = [(template.output, template.render()) for template in update_structure.TEMPLATES.values()]
+    card = update_structure.TEMPLATES['components/ClusterStatsCard.jsx']
+    for index in range(count - len(outputs)):
+        outputs.append((f"src/components/generated/Card{index:05d}.jsx", card.render()))
+    return outputs[:count]
+
+def files_emitted(manifest):
+    return manifest.written + manifest.skipped
+
+def run_scaffold(count):
+    """emit() alone, scaled past the registry with padding files"""
+    started = time.perf_counter()
+    outputs = scaffold_outputs(count)
+    rendered = time.perf_counter()
+    manifest = update_structure.Manifest()
+    update_structure.emit(outputs, manifest)
+    manifest.save()
+    return {'render_s': rendered - started, 'write_s': time.perf_counter() - rendered,
+            'files': len(outputs), 'written': manifest.written}
+
+def run_update(clusters):
+    """A whole update_structure() run: manifest, templates, status buckets and any shards"""
+    manifest = update_structure.update_structure(clusters=clusters)
+    return {'files': files_emitted(manifest), 'written': manifest.written}
+
+def measure(scenario):
+    """Run one scenario in this (fresh) process, in its workdir, and return its metrics
+
+    A warm-up only leaves its outputs behind for the measured run that follows.
+    """
+    os.chdir(scenario['workdir'])
+    run = run_scaffold if scenario['kind'] == 'scaffold' else run_update
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if scenario.get('warmup'):
+            run(scenario['size'])
+            return {}
+        before = read_proc_io()
+        started = time.perf_counter()
+        result = run(scenario['size'])
+        result['wall_s'] = time.perf_counter() - started
+        after = read_proc_io()
+    if before and after:
+        result['read_write_syscalls'] = (after['syscr'] - before['syscr']) + (after['syscw'] - before['syscw'])
+        result['bytes_written'] = after['wchar'] - before['wchar']
+    result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+def scenarios(sizes, clusters, filesystems):
+    for fs_name, base in filesystems.items():
+        for tree in ('cold', 'warm'):
+            for size in sizes:
+                yield {'name': f"scaffold-{size}/{tree}/{fs_name}", 'kind': 'scaffold',
+                       'size': size, 'tree': tree, 'base': base}
+            yield {'name': f"update/{tree}/{fs_name}", 'kind': 'update',
+                   'size': 0, 'tree': tree, 'base': base}
+            if clusters:
+                yield {'name': f"generate-{clusters}/{tree}/{fs_name}", 'kind': 'update',
+                       'size': clusters, 'tree': tree, 'base': base}
+
+def run_child(scenario):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--scenario', json.dumps(scenario)],
+        capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+def run_isolated(scenario, repeat=1):
+    """Measure a scenario in child processes so RSS and I/O counters are its own.
+
+    A warm tree is prepared by a child of its own, so the measured run's peak
+    RSS is not the warm-up's. Each metric is the median over repeat runs.
+    """
+    runs = []
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix='bench-', dir=scenario['base'])
+        try:
+            if scenario['tree'] == 'warm':
+                run_child(dict(scenario, workdir=workdir, warmup=True))
+            runs.append(run_child(dict(scenario, workdir=workdir)))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {key: statistics.median(metrics[key] for metrics in runs) for key in runs[0]}
+
+def compare(results, baseline, tolerance):
+    """List metrics that got worse than baseline by more than tolerance and their floor"""
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for key in COMPARED:
+            if key in metrics and previous.get(key):
+                ratio = metrics[key] / previous[key]
+                if ratio > 1 + tolerance and metrics[key] - previous[key] > FLOORS[key]:
+                    regressions.append(f"{name} {key}: {previous[key]:.4g} -> {metrics[key]:.4g} "
+                                       f"(+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark update_structure.py scaffolding")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), metavar='N',
+                        help="scaffold scenarios by number of output files (default: 10 1000 50000)")
+    parser.add_argument('--clusters', type=int, default=DEFAULT_CLUSTERS,
+                        help="records for the data generation scenario, 0 to skip (default: 100000)")
+    parser.add_argument('--disk-dir', default='.',
+                        help="where on-disk scenarios run (default: current directory)")
+    parser.add_argument('--no-tmpfs', action='store_true', help=f"skip scenarios on {TMPFS}")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per scenario, reporting the median (default: 3)")
+    parser.add_argument('--output', help="write results JSON here as well as stdout")
+    parser.add_argument('--baseline', help="compare against a stored results JSON")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown before a metric counts as a regression (default: 0.25)")
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        print(json.dumps(measure(json.loads(args.scenario))))
+        return 0
+
+    filesystems = {'disk': os.path.abspath(args.disk_dir)}
+    if not args.no_tmpfs and os.access(TMPFS, os.W_OK):
+        filesystems['tmpfs'] = TMPFS
+    results = {}
+    for scenario in scenarios(args.sizes, args.clusters, filesystems):
+        results[scenario['name']] = metrics = run_isolated(scenario, args.repeat)
+        print(f"{scenario['name']:<34} {metrics['wall_s']:8.3f}s  {metrics['files']:>6} files  "
+              f"{metrics.get('read_write_syscalls', 0):>7} r/w calls  {metrics.get('bytes_written', 0):>11} B  "
+              f"{metrics['peak_rss_kb']:>7} KB", file=sys.stderr)
+
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'scenarios': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['scenarios']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+        print(f"\nNo regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from array import array
+
+from heartbeat_loadgen import LoadGenerator, Reservoir
+
+DEFAULT_WINDOW = 0.5
+DEFAULT_MAX_PENDING = 100_000
+
+
+class JsonlPublisher:
+    """Append each fleet snapshot as one JSON line"""
+
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'a', encoding='utf-8')
+
+    async def publish(self, snapshot):
+        self.file.write(json.dumps(snapshot, separators=(',', ':')) + '\n')
+
+    async def close(self):
+        self.file.flush()
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class StandinPublisher:
+    """Write changed miner_states plus a fleet_snapshots/latest summary in one batch"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.client = None
+
+    async def publish(self, snapshot):
+        if self.client is None:
+            from firestore_standin import Client
+            self.client = await Client(self.host, self.port).connect()
+        writes = [{'collection': 'miner_states', 'doc': miner_id, 'data': doc}
+                  for miner_id, doc in snapshot['miners'].items()]
+        summary = {key: value for key, value in snapshot.items() if key != 'miners'}
+        writes.append({'collection': 'fleet_snapshots', 'doc': 'latest', 'data': summary})
+        await self.client.batch(writes)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+
+class NullPublisher:
+    async def publish(self, snapshot):
+        pass
+
+    async def close(self):
+        pass
+
+
+class CoalescingBatcher:
+    """Fold per-miner heartbeats into one fleet snapshot per window.
+
+    Only the latest document per miner survives a window, but every status
+    change inside it is kept in the snapshot's transitions. A window holds
+    at most max_pending heartbeats, which bounds the pending map, the
+    transitions and the submission times alike: once it is full the window
+    is cut short and write() waits for that publish, which pushes back on
+    the producers.
+    The batcher has the heartbeat_loadgen sink interface, so it can sit
+    between a LoadGenerator and a publisher.
+    """
+
+    def __init__(self, publisher, window=DEFAULT_WINDOW, max_pending=DEFAULT_MAX_PENDING, seed=0):
+        self.publisher = publisher
+        self.window = window
+        self.max_pending = max_pending
+        self.pending = {}
+        self.transitions = []
+        self.submitted_at = array('d')
+        self.statuses = {}
+        self.status_counts = {}
+        self.room = asyncio.Event()
+        self.room.set()
+        self.full = asyncio.Event()
+        self.ticker = None
+        self.closing = False
+        self.tick = 0
+        self.submitted = 0
+        self.published = 0
+        self.transition_count = 0
+        self.blocked = 0.0
+        self.latency = Reservoir(random.Random(seed))
+
+    def start(self):
+        if self.ticker is None:
+            self.ticker = asyncio.get_running_loop().create_task(self.run())
+
+    def check_ticker(self):
+        """Raise whatever stopped the ticker, so producers see a failed publish"""
+        if self.ticker is not None and self.ticker.done():
+            self.ticker.result()
+            raise RuntimeError("coalescer is closed")
+
+    async def write(self, docs):
+        self.start()
+        self.check_ticker()
+        clock = time.perf_counter
+        for doc in docs:
+            miner_id = doc['miner_id']
+            # Counted per heartbeat, not per miner: a flapping miner grows the transitions too
+            if len(self.submitted_at) >= self.max_pending:
+                waited = clock()
+                self.room.clear()
+                self.full.set()
+                await self.room.wait()
+                self.blocked += clock() - waited
+                self.check_ticker()
+            self.absorb(miner_id, doc, clock())
+
+    def absorb(self, miner_id, doc, now):
+        previous = self.pending.get(miner_id)
+        before = previous['current_status'] if previous else self.statuses.get(miner_id)
+        status = doc.get('current_status')
+        if before is not None and status != before:
+            self.transitions.append({'miner_id': miner_id, 'from': before, 'to': status,
+                                     'at': doc.get('last_heartbeat')})
+        self.pending[miner_id] = doc
+        self.submitted_at.append(now)
+        self.submitted += 1
+
+    async def flush(self):
+        if not self.pending and not self.transitions:
+            return
+        miners, transitions, submitted_at = self.pending, self.transitions, self.submitted_at
+        # Swap buffers first so producers can keep writing while we publish
+        self.pending, self.transitions, self.submitted_at = {}, [], array('d')
+        self.room.set()
+        for miner_id, doc in miners.items():
+            status = doc.get('current_status')
+            old = self.statuses.get(miner_id)
+            if old != status:
+                if old is not None:
+                    self.status_counts[old] -= 1
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+                self.statuses[miner_id] = status
+        self.tick += 1
+        await self.publisher.publish({
+            'tick': self.tick, 'published_at': time.time(), 'miners': miners,
+            'transitions': transitions,
+            'fleet': {'miners': len(self.statuses), 'statuses': dict(self.status_counts)},
+        })
+        done = time.perf_counter()
+        for submitted in submitted_at:
+            self.latency.add(done - submitted)
+        self.published += len(miners)
+        self.transition_count += len(transitions)
+
+    async def run(self):
+        next_tick = time.perf_counter() + self.window
+        while True:
+            try:
+                await asyncio.wait_for(self.full.wait(), max(0.0, next_tick - time.perf_counter()))
+                # Publishing early to make room; the next window starts now
+                next_tick = time.perf_counter()
+            except asyncio.TimeoutError:
+                pass
+            self.full.clear()
+            try:
+                await self.flush()
+            except BaseException:
+                # Release producers blocked on room; write() re-raises the error from this task
+                self.room.set()
+                raise
+            if self.closing:
+                return
+            # Skip ticks we fell behind on rather than publishing back to back
+            next_tick = max(next_tick + self.window, time.perf_counter())
+
+    async def close(self):
+        # Wake the ticker for a last publish instead of cancelling it mid-batch
+        self.closing = True
+        self.full.set()
+        try:
+            if self.ticker is not None:
+                await self.ticker
+            await self.flush()
+        finally:
+            await self.publisher.close()
+
+    def report(self):
+        return {
+            'window_s': self.window,
+            'ticks': self.tick,
+            'submitted': self.submitted,
+            'published': self.published,
+            'coalescing_ratio': round(self.submitted / self.published, 2) if self.published else 0.0,
+            'transitions': self.transition_count,
+            'producer_blocked_s': round(self.blocked, 3),
+            'latency_ms': self.latency.summary_ms((0.50, 0.90, 0.99)),
+        }
+
+async def replay(batcher, lines, batch_size=500):
+    """Feed recorded miner_states JSONL through the batcher as fast as it accepts it"""
+    batch = []
+    for line in lines:
+        if line.strip():
+            batch.append(json.loads(line))
+        if len(batch) >= batch_size:
+            await batcher.write(batch)
+            batch = []
+            await asyncio.sleep(0)
+    if batch:
+        await batcher.write(batch)
+    await batcher.close()
+
+def make_publisher(args):
+    if args.publish == 'standin':
+        return StandinPublisher(args.host, args.port)
+    if args.publish == 'jsonl':
+        return JsonlPublisher(args.output)
+    return NullPublisher()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Coalesce miner heartbeats into one fleet snapshot per window")
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW, metavar='SECONDS',
+                        help=f"publish interval (default: {DEFAULT_WINDOW})")
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING, metavar='HEARTBEATS',
+                        help="heartbeats buffered per window before producers are held back")
+    parser.add_argument('--input', metavar='FILE',
+                        help="replay a miner_states JSONL trace instead of generating heartbeats")
+    parser.add_argument('--miners', type=int, default=10_000)
+    parser.add_argument('--rate', type=float, default=1.0, help="heartbeats per miner per second")
+    parser.add_argument('--duration', type=float, default=10.0, metavar='SECONDS')
+    parser.add_argument('--flip-rate', type=float, default=0.001,
+                        help="per-heartbeat probability of a status change in generated traffic")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--publish', choices=['jsonl', 'standin', 'null'], default='null')
+    parser.add_argument('--output', default='fleet_snapshots.jsonl', help="JSONL publisher path")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    args = parser.parse_args(argv)
+
+    batcher = CoalescingBatcher(make_publisher(args), args.window, args.max_pending, args.seed)
+    report = {}
+    if args.input:
+        with open(args.input, encoding='utf-8') as file:
+            asyncio.run(replay(batcher, file))
+    else:
+        generator = LoadGenerator(args.miners, args.rate, batcher, flip_rate=args.flip_rate,
+                                  seed=args.seed)
+        report['producer'] = asyncio.run(generator.run(args.duration))
+    report['batcher'] = batcher.report()
+    print(json.dumps(report, indent=2), file=sys.stderr if args.output == '-' else sys.stdout)
+
+if __name__ == "__main__":
+    main()
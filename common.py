@@ -0,0 +1,62 @@
+import os
+import threading
+from datetime import datetime
+
+UNKNOWN = 'Unknown'
+
+
+def to_ms(value):
+    """Epoch milliseconds from a Firestore timestamp, ISO string or epoch number"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        seconds = value.get('seconds', value.get('_seconds'))
+        if seconds is None:
+            return None
+        return seconds * 1000 + value.get('nanoseconds', value.get('_nanoseconds', 0)) // 1_000_000
+    if isinstance(value, (int, float)):
+        # Anything this large is already in milliseconds
+        return int(value if value > 1e11 else value * 1000)
+    try:
+        return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp() * 1000)
+    except ValueError:
+        return None
+
+def miner_hardware(resource):
+    """(gpu_type, cluster_type) the way Dashboard.jsx labels a miner's compute resource"""
+    if not resource:
+        return UNKNOWN, UNKNOWN
+    resource_type = resource.get('resource_type') or 'CPU'
+    if resource_type == 'GPU':
+        device = (resource.get('gpu_specs') or {}).get('gpu_name') or 'Unknown GPU'
+    else:
+        device = (resource.get('cpu_specs') or {}).get('cpu_name') or 'Unknown CPU'
+    return device, 'CPU' if resource_type == 'CPU' else 'GPU'
+
+def subscription_miner(data):
+    info = data.get('container_info') or {}
+    return data.get('miner_id') or info.get('miner_id')
+
+def temp_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+def write_atomic(path, data, fsync=False, sync=os.fsync):
+    """Write data to a temp file beside path and rename it into place
+
+    sync is what flushes the file descriptor to disk when fsync is set.
+    """
+    tmp_path = temp_path(path)
+    # os.open honours the umask, unlike mkstemp's fixed 0600
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            if fsync:
+                file.flush()
+                sync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
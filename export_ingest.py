@@ -0,0 +1,257 @@
+import argparse
+import codecs
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from common import subscription_miner, write_atomic
+
+COLLECTIONS = ('miner_states', 'compute_resources', 'container_subscriptions')
+# Shard for documents that name no miner at all
+UNASSIGNED = '_unassigned'
+CHECKPOINT_DIR = '.checkpoints'
+CHUNK_SIZE = 1 << 20
+FLUSH_BYTES = 64 << 20
+WHITESPACE = ' \t\n\r,'
+
+
+class ExportReader:
+    """Incremental parser for {collection: {doc_id: data}} exports.
+
+    Only the current read chunk and one document are held in memory.
+    position() is a (byte offset, collection) pair that a new reader can
+    resume from. With single set, the file is one collection's {doc_id: data}.
+    """
+
+    def __init__(self, path, offset=0, collection=None, single=None, chunk_size=CHUNK_SIZE):
+        if offset and collection is None:
+            raise ValueError("resuming needs the collection the offset points into")
+        self.file = open(path, 'rb')
+        self.file.seek(offset)
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.json = json.JSONDecoder()
+        self.chunk_size = chunk_size
+        self.single = single
+        self.collection = collection or (single if offset else None)
+        self.base = offset
+        self.buffer = ''
+        self.pos = 0
+
+    def close(self):
+        self.file.close()
+
+    def fill(self):
+        """Read one more chunk; False at end of file"""
+        if self.pos:
+            # Drop the parsed prefix, keeping track of its length in bytes
+            self.base += len(self.buffer[:self.pos].encode('utf-8'))
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.file.read(self.chunk_size)
+        self.buffer += self.text.decode(chunk, final=not chunk)
+        return bool(chunk)
+
+    def position(self):
+        return self.base + len(self.buffer[:self.pos].encode('utf-8')), self.collection
+
+    def next_char(self):
+        """Skip whitespace and separators and return the next character"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError(f"unexpected end of export at byte {self.position()[0]}")
+
+    def expect(self, char):
+        found = self.next_char()
+        if found != char:
+            raise ValueError(f"expected {char!r} but found {found!r} at byte {self.position()[0]}")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next JSON value, reading further until it is complete"""
+        self.next_char()
+        while True:
+            try:
+                value, self.pos = self.json.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+
+    def collection_docs(self):
+        while self.next_char() != '}':
+            doc_id = self.decode()
+            self.expect(':')
+            yield self.collection, doc_id, self.decode()
+        self.pos += 1
+
+    def documents(self):
+        """Yield (collection, doc_id, data) in file order"""
+        if self.collection is None:
+            self.expect('{')
+            self.collection = self.single
+        if self.collection is not None:
+            yield from self.collection_docs()
+            if self.single:
+                return
+        while self.next_char() != '}':
+            self.collection = self.decode()
+            self.expect(':')
+            self.expect('{')
+            yield from self.collection_docs()
+
+
+def document_miner(data):
+    # Subscriptions may only carry the miner inside container_info
+    return subscription_miner(data) or UNASSIGNED
+
+
+class ShardWriter:
+    """Buffer lines per miner and append them to <root>/<miner>.jsonl in batches.
+
+    Each miner's batch goes out in one O_APPEND write, so processes ingesting
+    different input files can share the same shard files.
+    """
+
+    def __init__(self, root, flush_bytes=FLUSH_BYTES, fsync=False):
+        self.root = root
+        self.flush_bytes = flush_bytes
+        self.fsync = fsync
+        self.pending = {}
+        self.size = 0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, miner_id):
+        return os.path.join(self.root, re.sub(r'[^\w.-]', '_', miner_id) + '.jsonl')
+
+    def add(self, miner_id, line):
+        """Queue a line; True once the buffered lines should be flushed"""
+        self.pending.setdefault(miner_id, []).append(line)
+        self.size += len(line)
+        return self.size >= self.flush_bytes
+
+    def flush(self):
+        for miner_id, lines in self.pending.items():
+            data = memoryview(''.join(lines).encode('utf-8'))
+            fd = os.open(self.path(miner_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.pending.clear()
+        self.size = 0
+
+
+def checkpoint_path(out_dir, input_path):
+    key = hashlib.sha256(os.path.abspath(input_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(out_dir, CHECKPOINT_DIR, f"{key}.json")
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+def save_checkpoint(path, checkpoint):
+    write_atomic(path, json.dumps(checkpoint).encode('utf-8'))
+
+def ingest_file(input_path, out_dir, collections=COLLECTIONS, single=None,
+                flush_bytes=FLUSH_BYTES, fsync=False, restart=False):
+    """Partition one export file into per-miner shards, resuming from its checkpoint.
+
+    The checkpoint only advances after the lines before it have been appended,
+    so a crash replays at most one batch. Replayed lines are identical, and
+    read_shard() keeps one copy of each document.
+    """
+    started = time.perf_counter()
+    state_path = checkpoint_path(out_dir, input_path)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    checkpoint = None if restart else load_checkpoint(state_path)
+    if checkpoint and checkpoint['done']:
+        return {'input': input_path, 'documents': 0, 'skipped': True, 'elapsed_s': 0.0}
+    checkpoint = checkpoint or {'input': os.path.abspath(input_path), 'offset': 0,
+                                'collection': None, 'documents': 0, 'done': False}
+
+    reader = ExportReader(input_path, checkpoint['offset'], checkpoint['collection'], single)
+    writer = ShardWriter(out_dir, flush_bytes, fsync)
+    wanted = set(collections)
+    documents = 0
+
+    def commit(done=False):
+        writer.flush()
+        checkpoint['offset'], checkpoint['collection'] = reader.position()
+        checkpoint['documents'] += documents
+        checkpoint['done'] = done
+        save_checkpoint(state_path, checkpoint)
+
+    try:
+        for collection, doc_id, data in reader.documents():
+            if collection not in wanted:
+                continue
+            documents += 1
+            line = json.dumps({'collection': collection, 'id': doc_id, 'data': data},
+                              separators=(',', ':')) + '\n'
+            if writer.add(document_miner(data), line):
+                commit()
+                documents = 0
+        commit(done=True)
+    finally:
+        reader.close()
+    return {'input': input_path, 'documents': checkpoint['documents'], 'skipped': False,
+            'elapsed_s': round(time.perf_counter() - started, 3)}
+
+def read_shard(path):
+    """A miner's documents as {collection: {doc_id: data}}, latest line winning"""
+    docs = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            record = json.loads(line)
+            docs.setdefault(record['collection'], {})[record['id']] = record['data']
+    return docs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Stream Firestore JSON exports into one JSONL shard per miner")
+    parser.add_argument('inputs', nargs='+', metavar='EXPORT',
+                        help="{collection: {doc_id: data}} files (or {doc_id: data} with --collection)")
+    parser.add_argument('--output', default='miner-shards', help="shard directory (default: miner-shards)")
+    parser.add_argument('--collections', nargs='+', default=list(COLLECTIONS), metavar='NAME',
+                        help=f"collections to keep (default: {' '.join(COLLECTIONS)})")
+    parser.add_argument('--collection', metavar='NAME',
+                        help="the inputs each hold just this collection's documents")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="input files ingested in parallel (default: one per CPU)")
+    parser.add_argument('--flush-mb', type=int, default=FLUSH_BYTES >> 20,
+                        help="buffered shard data per process before each append and checkpoint "
+                             f"(default: {FLUSH_BYTES >> 20})")
+    parser.add_argument('--fsync', action='store_true', help="fsync shards before each checkpoint")
+    parser.add_argument('--restart', action='store_true', help="ignore checkpoints and start over")
+    args = parser.parse_args(argv)
+
+    collections = [args.collection] if args.collection else args.collections
+    started = time.perf_counter()
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [pool.submit(ingest_file, path, args.output, collections, args.collection,
+                               args.flush_mb << 20, args.fsync, args.restart) for path in args.inputs]
+        for future in as_completed(futures):
+            result = future.result()
+            total += result['documents']
+            if result['skipped']:
+                print(f"{result['input']}: already ingested")
+            else:
+                print(f"{result['input']}: {result['documents']} documents in {result['elapsed_s']}s")
+    print(f"Ingested {total} documents from {len(args.inputs)} files into {args.output} "
+          f"in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import defaultdict
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+# Whole query results travel as one line, so allow far more than asyncio's 64 KiB
+LINE_LIMIT = 2 ** 28
+
+# Fields the dashboard filters on, per collection (see Dashboard.jsx, PodsView.jsx)
+INDEXED_FIELDS = {
+    'miner_states': ['miner_id'],
+    'compute_resources': ['miner_id'],
+    'container_subscriptions': ['miner_id', 'container_info.miner_id', 'user_id'],
+    'miners': ['status'],
+    'users': ['user_type', 'email'],
+}
+
+# Firestore's where('__name__', '==', id) addresses the document id
+DOCUMENT_ID = '__name__'
+
+
+def get_field(data, path):
+    """Resolve a dotted Firestore field path, returning None when absent"""
+    for part in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+def matches(doc_id, data, filters):
+    """Check a document against (field, op, value) filters"""
+    for field, op, value in filters:
+        actual = doc_id if field == DOCUMENT_ID else get_field(data, field)
+        if op == '==':
+            ok = actual == value
+        elif op == '!=':
+            ok = actual is not None and actual != value
+        elif op == 'in':
+            ok = actual in value
+        elif op == 'array-contains':
+            ok = isinstance(actual, list) and value in actual
+        elif actual is None:
+            ok = False
+        else:
+            try:
+                ok = {'<': actual < value, '<=': actual <= value,
+                      '>': actual > value, '>=': actual >= value}[op]
+            except TypeError:
+                ok = False
+            except KeyError:
+                raise ValueError(f"unsupported operator {op!r}") from None
+        if not ok:
+            return False
+    return True
+
+# (earlier change, later change) to a document within one batch -> net change
+FOLDED_CHANGES = {
+    ('added', 'modified'): 'added', ('added', 'removed'): None,
+    ('modified', 'modified'): 'modified', ('modified', 'removed'): 'removed',
+    ('removed', 'added'): 'modified',
+}
+
+def hashable(value):
+    return json.dumps(value, sort_keys=True) if isinstance(value, (dict, list)) else value
+
+
+class Listener:
+    """A standing query whose changes are pushed after every relevant write"""
+
+    def __init__(self, listener_id, collection, filters, send):
+        self.id = listener_id
+        self.collection = collection
+        self.filters = filters
+        self.send = send
+
+
+class Collection:
+    """Documents of one collection plus equality indexes on selected fields"""
+
+    def __init__(self, name, indexed_fields=()):
+        self.name = name
+        self.docs = {}
+        self.indexes = {field: defaultdict(set) for field in indexed_fields}
+        # Listeners with an equality filter on an indexed field are bucketed by
+        # value so a write only wakes the listeners it can affect
+        self.keyed_listeners = {field: defaultdict(set) for field in indexed_fields}
+        self.other_listeners = set()
+
+    def index(self, doc_id, data, add):
+        for field, index in self.indexes.items():
+            value = hashable(get_field(data, field))
+            if value is None:
+                continue
+            if add:
+                index[value].add(doc_id)
+            else:
+                index[value].discard(doc_id)
+                if not index[value]:
+                    del index[value]
+
+    def put(self, doc_id, data, merge=False):
+        """Insert or replace a document, returning (old, new); merge is top-level only"""
+        old = self.docs.get(doc_id)
+        if old is not None:
+            self.index(doc_id, old, add=False)
+            if merge:
+                data = {**old, **data}
+        self.docs[doc_id] = data
+        self.index(doc_id, data, add=True)
+        return old, data
+
+    def delete(self, doc_id):
+        old = self.docs.pop(doc_id, None)
+        if old is not None:
+            self.index(doc_id, old, add=False)
+        return old
+
+    def candidates(self, filters):
+        """Smallest set of document ids that can satisfy filters"""
+        best = None
+        for field, op, value in filters:
+            if field == DOCUMENT_ID and op == '==':
+                return [value] if value in self.docs else []
+            if op != '==' or field not in self.indexes:
+                continue
+            ids = self.indexes[field].get(hashable(value), ())
+            if best is None or len(ids) < len(best):
+                best = ids
+        return self.docs.keys() if best is None else best
+
+    def query(self, filters=(), limit=None):
+        results = []
+        for doc_id in list(self.candidates(filters)):
+            data = self.docs[doc_id]
+            if matches(doc_id, data, filters):
+                results.append({'id': doc_id, 'data': data})
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def listener_key(self, filters):
+        for field, op, value in filters:
+            if op == '==' and field in self.keyed_listeners:
+                return field, hashable(value)
+        return None
+
+    def add_listener(self, listener):
+        key = self.listener_key(listener.filters)
+        if key is None:
+            self.other_listeners.add(listener)
+        else:
+            self.keyed_listeners[key[0]][key[1]].add(listener)
+
+    def remove_listener(self, listener):
+        key = self.listener_key(listener.filters)
+        if key is None:
+            self.other_listeners.discard(listener)
+        else:
+            self.keyed_listeners[key[0]][key[1]].discard(listener)
+
+    def affected_listeners(self, *versions):
+        """Listeners whose result set may change given old/new document data"""
+        affected = set(self.other_listeners)
+        for field, buckets in self.keyed_listeners.items():
+            for data in versions:
+                if data is not None:
+                    affected |= buckets.get(hashable(get_field(data, field)), set())
+        return affected
+
+
+def check_write(write):
+    """Reject a batch write that apply() could not carry out"""
+    if not isinstance(write, dict):
+        raise ValueError(f"write must be an object, got {write!r}")
+    for field in ('collection', 'doc'):
+        if not isinstance(write.get(field), str):
+            raise ValueError(f"write without a string {field!r}: {write!r}")
+    if not write.get('delete') and not isinstance(write.get('data'), dict):
+        raise ValueError(f"write without 'data' or 'delete': {write!r}")
+
+
+class Store:
+    """In-memory collections with indexed queries and snapshot listeners"""
+
+    def __init__(self, indexed_fields=None):
+        self.indexed_fields = INDEXED_FIELDS if indexed_fields is None else indexed_fields
+        self.collections = {}
+        self.listeners = {}
+        self.listener_ids = itertools.count(1)
+
+    def collection(self, name):
+        if name not in self.collections:
+            self.collections[name] = Collection(name, self.indexed_fields.get(name, ()))
+        return self.collections[name]
+
+    def load(self, export):
+        """Load {collection: {doc_id: data}} as written by a local export"""
+        for name, docs in export.items():
+            collection = self.collection(name)
+            for doc_id, data in docs.items():
+                collection.put(doc_id, data)
+
+    def dump(self):
+        return {name: collection.docs for name, collection in self.collections.items()}
+
+    def set(self, name, doc_id, data, merge=False):
+        self.apply([{'collection': name, 'doc': doc_id, 'data': data, 'merge': merge}])
+
+    def delete(self, name, doc_id):
+        self.apply([{'collection': name, 'doc': doc_id, 'delete': True}])
+
+    def apply(self, writes):
+        """Commit writes together; each affected listener gets one snapshot for all of them"""
+        # Checked up front: a bad write must not leave the ones before it committed but unannounced
+        for write in writes:
+            check_write(write)
+        pending = {}
+        for write in writes:
+            collection = self.collection(write['collection'])
+            doc_id = write['doc']
+            if write.get('delete'):
+                old, new = collection.delete(doc_id), None
+                if old is None:
+                    continue
+            else:
+                old, new = collection.put(doc_id, write['data'], write.get('merge', False))
+            self.collect(pending, collection, doc_id, old, new)
+        for listener, changes in pending.items():
+            if changes:
+                listener.send({'listener': listener.id, 'event': 'snapshot',
+                               'changes': list(changes.values())})
+
+    def listen(self, name, filters, send):
+        listener = Listener(next(self.listener_ids), name, filters, send)
+        self.collection(name).add_listener(listener)
+        self.listeners[listener.id] = listener
+        return listener.id
+
+    def unlisten(self, listener_id):
+        listener = self.listeners.pop(listener_id, None)
+        if listener is not None:
+            self.collection(listener.collection).remove_listener(listener)
+
+    def collect(self, pending, collection, doc_id, old, new):
+        """Record one write as a docChange for every listener whose results it touches.
+
+        Several writes to a document within a batch fold into one change, so
+        a listener sees the batch's net effect.
+        """
+        for listener in collection.affected_listeners(old, new):
+            before = old is not None and matches(doc_id, old, listener.filters)
+            after = new is not None and matches(doc_id, new, listener.filters)
+            if not (before or after):
+                continue
+            kind = 'modified' if before and after else 'added' if after else 'removed'
+            changes = pending.setdefault(listener, {})
+            previous = changes.get(doc_id)
+            if previous is not None:
+                kind = FOLDED_CHANGES[previous['type'], kind]
+                if kind is None:
+                    del changes[doc_id]
+                    continue
+            # Removals carry the document as it was last seen by the listener
+            changes[doc_id] = {'type': kind, 'id': doc_id, 'data': new if after else old}
+
+    def stats(self):
+        return {name: {'docs': len(collection.docs),
+                       'indexes': {field: len(index) for field, index in collection.indexes.items()}}
+                for name, collection in self.collections.items()}
+
+
+class Server:
+    """Newline-delimited JSON protocol over TCP in front of a Store"""
+
+    def __init__(self, store):
+        self.store = store
+        self.latency = defaultdict(lambda: [0, 0])
+        # Connections written to since the last drain, including other clients' listeners
+        self.unflushed = set()
+
+    async def drain(self):
+        """Wait until every connection this request wrote to has room again.
+
+        Listener snapshots are written from the request that caused them, so
+        a slow listener holds back the writers feeding it instead of letting
+        its buffer grow without bound.
+        """
+        writers, self.unflushed = self.unflushed, set()
+        results = await asyncio.gather(*(writer.drain() for writer in writers), return_exceptions=True)
+        for result in results:
+            # A listener going away is its own connection's problem, not the writer's
+            if isinstance(result, Exception) and not isinstance(result, ConnectionError):
+                raise result
+
+    async def handle(self, reader, writer):
+        owned = []
+
+        def send(message):
+            if writer.is_closing():
+                return
+            writer.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+            self.unflushed.add(writer)
+
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                started = time.perf_counter_ns()
+                try:
+                    response = self.dispatch(request, send, owned)
+                except (KeyError, ValueError, TypeError) as error:
+                    response = {'ok': False, 'error': repr(error)}
+                elapsed = (time.perf_counter_ns() - started) // 1000
+                totals = self.latency[request.get('op')]
+                totals[0] += 1
+                totals[1] += elapsed
+                send({'id': request.get('id'), 'elapsed_us': elapsed, **response})
+                await self.drain()
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            for listener_id in owned:
+                self.store.unlisten(listener_id)
+            writer.close()
+
+    def dispatch(self, request, send, owned):
+        op = request['op']
+        name = request.get('collection')
+        filters = [tuple(condition) for condition in request.get('where', ())]
+        if op == 'get':
+            data = self.store.collection(name).docs.get(request['doc'])
+            return {'ok': True, 'doc': data}
+        if op == 'query':
+            docs = self.store.collection(name).query(filters, request.get('limit'))
+            return {'ok': True, 'docs': docs}
+        if op == 'set':
+            self.store.set(name, request['doc'], request['data'], request.get('merge', False))
+            return {'ok': True}
+        if op == 'batch':
+            self.store.apply(request['writes'])
+            return {'ok': True, 'count': len(request['writes'])}
+        if op == 'delete':
+            self.store.delete(name, request['doc'])
+            return {'ok': True}
+        if op == 'listen':
+            listener_id = self.store.listen(name, filters, send)
+            owned.append(listener_id)
+            # The initial result set rides on the response, like onSnapshot's first call
+            docs = self.store.collection(name).query(filters)
+            return {'ok': True, 'listener': listener_id, 'docs': docs}
+        if op == 'unlisten':
+            self.store.unlisten(request['listener'])
+            return {'ok': True}
+        if op == 'stats':
+            latency = {name: {'count': count, 'mean_us': total / count}
+                       for name, (count, total) in self.latency.items() if count}
+            return {'ok': True, 'collections': self.store.stats(), 'latency': latency}
+        raise ValueError(f"unknown op {op!r}")
+
+
+class Client:
+    """Minimal asyncio client for the stand-in, used by the load tools"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.pending_listeners = {}
+        self.listeners = {}
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port,
+                                                                 limit=LINE_LIMIT)
+        self.receiver = asyncio.create_task(self.receive())
+        return self
+
+    async def receive(self):
+        try:
+            await self.read_messages()
+        except Exception as error:
+            failure = error
+        else:
+            failure = ConnectionError("stand-in closed the connection")
+        # Never leave a caller waiting on a response that cannot arrive
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(failure)
+        self.pending.clear()
+        self.pending_listeners.clear()
+
+    async def read_messages(self):
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            if message.get('event') == 'snapshot':
+                callback = self.listeners.get(message['listener'])
+                if callback:
+                    callback(message)
+            elif message.get('id') in self.pending:
+                # Register listeners here so no snapshot can slip in before the caller resumes
+                callback = self.pending_listeners.pop(message['id'], None)
+                if callback and message.get('ok'):
+                    self.listeners[message['listener']] = callback
+                    # Like onSnapshot, the first call reports every result as added
+                    callback({'listener': message['listener'], 'event': 'snapshot',
+                              'changes': [{'type': 'added', **doc} for doc in message['docs']]})
+                self.pending.pop(message['id']).set_result(message)
+
+    async def request(self, op, callback=None, **fields):
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        if callback is not None:
+            self.pending_listeners[request_id] = callback
+        message = {'id': request_id, 'op': op, **fields}
+        self.writer.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        response = await future
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error'))
+        return response
+
+    async def query(self, collection, where=(), limit=None):
+        return (await self.request('query', collection=collection, where=list(where),
+                                   limit=limit))['docs']
+
+    async def set(self, collection, doc, data, merge=False):
+        await self.request('set', collection=collection, doc=doc, data=data, merge=merge)
+
+    async def batch(self, writes):
+        await self.request('batch', writes=writes)
+
+    async def listen(self, collection, where, callback):
+        """Call callback with docChanges: the initial results as added, then one
+        snapshot per committed write or batch that touches the results"""
+        response = await self.request('listen', callback, collection=collection, where=list(where))
+        return response['listener']
+
+    async def close(self):
+        self.receiver.cancel()
+        self.writer.close()
+
+
+async def serve(store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = Server(store)
+    listener = await asyncio.start_server(server.handle, host, port, limit=LINE_LIMIT)
+    print(f"Firestore stand-in listening on {host}:{port} "
+          f"({sum(len(c.docs) for c in store.collections.values())} documents)")
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve dashboard collections from local data for load testing")
+    parser.add_argument('--data', metavar='FILE',
+                        help="JSON export shaped {collection: {doc_id: data}}")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    store = Store()
+    if args.data:
+        with open(args.data, encoding='utf-8') as file:
+            store.load(json.load(file))
+    try:
+        asyncio.run(serve(store, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
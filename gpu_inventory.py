@@ -0,0 +1,224 @@
+import argparse
+import json
+import random
+import re
+import sys
+import time
+
+from search_index import SHOW_ALL, STATUSES
+
+# clusterType is optional on a cluster; those without one are grouped under this
+UNASSIGNED = 'Unassigned'
+
+
+def gpu_key(name):
+    """'RTX 4090', 'rtx4090' and ' RTX  4090 ' all name the same GPU"""
+    return re.sub(r'[^A-Z0-9]', '', str(name).upper())
+
+def parse_count(value):
+    """GPU count from the display string ('x55', '55', 'x 55') or a number; None if unreadable"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*[xX×]?\s*(\d+)\s*[xX×]?\s*', str(value or ''))
+    return int(match.group(1)) if match else None
+
+
+class Inventory:
+    """Typed GPU counts indexed by GPU type × status × cluster type.
+
+    Every cluster contributes to exactly one cell, so a status change or a
+    termination moves its count between two cells and queries only ever
+    add up cells, never clusters.
+    """
+
+    def __init__(self, gpu_types=()):
+        # gpu_key -> display label; the seed's gpuTypes spelling wins
+        self.labels = {gpu_key(label): label for label in gpu_types}
+        self.cells = {}
+        self.clusters = {}
+        self.unparsed = 0
+
+    @classmethod
+    def from_clusters(cls, clusters, gpu_types=()):
+        """Index records in the initialClusters schema, keyed by their position"""
+        inventory = cls(gpu_types)
+        for position, record in enumerate(clusters):
+            inventory.add(position, record)
+        return inventory
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def label(self, gpu_type):
+        key = gpu_key(gpu_type)
+        if key not in self.labels:
+            self.labels[key] = ' '.join(str(gpu_type).split()) or 'Unknown'
+        return self.labels[key]
+
+    def contribute(self, cell, gpus, sign):
+        totals = self.cells.get(cell)
+        if totals is None:
+            totals = self.cells[cell] = [0, 0]
+        totals[0] += sign
+        totals[1] += sign * gpus
+        if not totals[0]:
+            del self.cells[cell]
+
+    def cell(self, record):
+        """(cell, gpus) a cluster record contributes"""
+        gpu = record.get('gpu') or {}
+        gpus = parse_count(gpu.get('count'))
+        if gpus is None:
+            self.unparsed += 1
+            gpus = 0
+        return (self.label(gpu.get('type', 'Unknown')), record.get('status'),
+                record.get('clusterType') or UNASSIGNED), gpus
+
+    def add(self, cluster_id, record):
+        """Count a cluster, replacing whatever it contributed before"""
+        self.remove(cluster_id)
+        cell, gpus = self.cell(record)
+        self.clusters[cluster_id] = (cell, gpus)
+        self.contribute(cell, gpus, 1)
+
+    def count(self, record):
+        """Count a cluster that will never be changed or removed, without remembering it"""
+        self.contribute(*self.cell(record), 1)
+
+    def remove(self, cluster_id):
+        previous = self.clusters.pop(cluster_id, None)
+        if previous is not None:
+            self.contribute(*previous, -1)
+        return previous
+
+    def set_status(self, cluster_id, status):
+        (gpu_type, old, cluster_type), gpus = self.clusters[cluster_id]
+        if old == status:
+            return
+        self.remove(cluster_id)
+        cell = (gpu_type, status, cluster_type)
+        self.clusters[cluster_id] = (cell, gpus)
+        self.contribute(cell, gpus, 1)
+
+    def terminate(self, cluster_id):
+        # Same as handleTerminate in App.jsx: the cluster stays, as Terminated
+        self.set_status(cluster_id, 'Terminated')
+
+    def capacity(self, gpu_type=None, status=None, cluster_type=None):
+        """{'clusters', 'gpus'} over the cells matching every given dimension"""
+        gpu_type = None if gpu_type is None else self.labels.get(gpu_key(gpu_type), gpu_type)
+        status = None if status == SHOW_ALL else status
+        clusters = gpus = 0
+        for (cell_type, cell_status, cell_cluster_type), (count, total) in self.cells.items():
+            if ((gpu_type is None or cell_type == gpu_type)
+                    and (status is None or cell_status == status)
+                    and (cluster_type is None or cell_cluster_type == cluster_type)):
+                clusters += count
+                gpus += total
+        return {'clusters': clusters, 'gpus': gpus}
+
+    def module_params(self):
+        """Placeholder values for templates/src/data/gpuInventory.js.tmpl"""
+        gpu_totals = {}
+        for (gpu_type, _, _), (_, gpus) in self.cells.items():
+            gpu_totals[gpu_type] = gpu_totals.get(gpu_type, 0) + gpus
+        return {
+            'gpuTotals': dict(sorted(gpu_totals.items())),
+            'cells': [[*cell, count, gpus] for cell, (count, gpus) in sorted(
+                self.cells.items(), key=lambda item: tuple(str(part) for part in item[0]))],
+        }
+
+
+def linear_capacity(clusters, gpu_type=None, status=None, cluster_type=None):
+    """The same answer by scanning and parsing every cluster's display strings"""
+    key = None if gpu_type is None else gpu_key(gpu_type)
+    count = gpus = 0
+    for cluster in clusters:
+        if ((key is None or gpu_key(cluster['gpu']['type']) == key)
+                and (status in (None, SHOW_ALL) or cluster['status'] == status)
+                and (cluster_type is None or (cluster.get('clusterType') or UNASSIGNED) == cluster_type)):
+            count += 1
+            gpus += parse_count(cluster['gpu']['count']) or 0
+    return {'clusters': count, 'gpus': gpus}
+
+def benchmark(clusters, gpu_types, cluster_types, changes=10_000, queries=1000, seed=0):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    inventory = Inventory.from_clusters(clusters, gpu_types)
+    built = time.perf_counter()
+
+    # Status changes and terminations, applied to both the index and the records
+    for _ in range(changes):
+        position = rng.randrange(len(clusters))
+        if rng.random() < 0.3:
+            inventory.terminate(position)
+            clusters[position]['status'] = 'Terminated'
+        else:
+            status = rng.choice(STATUSES)
+            inventory.set_status(position, status)
+            clusters[position]['status'] = status
+    updated = time.perf_counter()
+
+    mismatches = 0
+    timings = []
+    linear_s = 0.0
+    for _ in range(queries):
+        query = (rng.choice((None,) + tuple(gpu_types)), rng.choice((None,) + STATUSES),
+                 rng.choice((None, UNASSIGNED) + tuple(cluster_types)))
+        started_query = time.perf_counter()
+        found = inventory.capacity(*query)
+        timings.append(time.perf_counter() - started_query)
+        started_query = time.perf_counter()
+        mismatches += found != linear_capacity(clusters, *query)
+        linear_s += time.perf_counter() - started_query
+    timings.sort()
+    return {
+        'clusters': len(clusters), 'cells': len(inventory.cells), 'changes': changes,
+        'queries': queries, 'mismatches': mismatches, 'unparsed_counts': inventory.unparsed,
+        'build_s': round(built - started, 3),
+        'update_us': round((updated - built) / changes * 1e6, 3) if changes else 0.0,
+        'query_us_p50': round(timings[len(timings) // 2] * 1e6, 1),
+        'query_us_max': round(timings[-1] * 1e6, 1),
+        'linear_ms_per_query': round(linear_s / queries * 1000, 3),
+    }
+
+def main(argv=None):
+    import update_structure
+
+    parser = argparse.ArgumentParser(
+        description="Check the GPU inventory index against a linear scan and time its queries")
+    parser.add_argument('--clusters', metavar='FILE',
+                        help="JSON with initialClusters (and gpuTypes/clusterTypes), or a bare list "
+                             "(default: generate)")
+    parser.add_argument('--generate', type=int, default=100_000, metavar='N',
+                        help="synthetic clusters when --clusters is not given (default: 100000)")
+    parser.add_argument('--changes', type=int, default=10_000,
+                        help="random status changes and terminations to apply before querying")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--summary', action='store_true',
+                        help="print the exported summary instead of benchmarking")
+    args = parser.parse_args(argv)
+
+    with open(update_structure.SEED_DATA, encoding='utf-8') as file:
+        seed_data = json.load(file)
+    if args.clusters:
+        with open(args.clusters, encoding='utf-8') as file:
+            data = json.load(file)
+        clusters = data['initialClusters'] if isinstance(data, dict) else data
+        if isinstance(data, dict):
+            seed_data = {**seed_data, **data}
+    else:
+        clusters = list(update_structure.generate_clusters(args.generate, args.seed))
+    gpu_types, cluster_types = seed_data['gpuTypes'], seed_data['clusterTypes']
+    if args.summary:
+        print(json.dumps(Inventory.from_clusters(clusters, gpu_types).module_params(), indent=2))
+        return 0
+    report = benchmark(clusters, gpu_types, cluster_types, args.changes, args.queries, args.seed)
+    print(json.dumps(report, indent=2))
+    return 1 if report['mismatches'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
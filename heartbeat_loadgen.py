@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import heapq
+import json
+import random
+import sys
+import time
+from array import array
+
+# current_status values written by the miner backend (see mapFirestoreStatus in Dashboard.jsx)
+STATUSES = ['online', 'offline', 'pending_verification', 'terminated', 'failed']
+IDLE_STATUSES = {'offline', 'terminated', 'failed'}
+OS_VERSIONS = ['Ubuntu 22.04.4 LTS', 'Ubuntu 20.04.6 LTS', 'Debian GNU/Linux 12', 'Rocky Linux 9.3']
+
+# Lateness samples kept for percentiles; reservoir sampling keeps memory flat
+SKEW_SAMPLES = 100_000
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class Reservoir:
+    """Uniform sample of at most size values from a stream, plus its count and maximum"""
+
+    def __init__(self, rng, size=SKEW_SAMPLES):
+        self.rng = rng
+        self.size = size
+        self.values = array('d')
+        self.seen = 0
+        self.max = 0.0
+
+    def add(self, value):
+        self.seen += 1
+        self.max = max(self.max, value)
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.size:
+                self.values[slot] = value
+
+    def summary_ms(self, fractions=(0.50, 0.99)):
+        """{'p50': ..., 'max': ...} in milliseconds"""
+        values = sorted(self.values)
+        summary = {f"p{round(fraction * 100)}": round(percentile(values, fraction) * 1000, 3)
+                   for fraction in fractions}
+        summary['max'] = round(self.max * 1000, 3)
+        return summary
+
+def firestore_timestamp(seconds):
+    whole = int(seconds)
+    return {'seconds': whole, 'nanoseconds': int((seconds - whole) * 1e9)}
+
+def clamp(value, low=0.0, high=100.0):
+    return low if value < low else high if value > high else value
+
+
+class Miner:
+    """Simulated miner: a random walk over its usage metrics plus status"""
+
+    __slots__ = ('miner_id', 'hostname', 'os_version', 'status', 'cpu', 'memory', 'disk',
+                 'heartbeats', 'outage_until', 'status_before_outage')
+
+    def __init__(self, index, rng):
+        self.miner_id = f"miner-{index:06d}"
+        self.hostname = f"node-{index:06d}"
+        self.os_version = rng.choice(OS_VERSIONS)
+        self.status = 'online'
+        self.cpu = rng.uniform(5, 80)
+        self.memory = rng.uniform(5, 80)
+        self.disk = rng.uniform(10, 70)
+        self.heartbeats = 0
+        self.outage_until = 0.0
+        self.status_before_outage = None
+
+    def step(self, rng):
+        self.cpu = clamp(self.cpu + rng.gauss(0, 6))
+        self.memory = clamp(self.memory + rng.gauss(0, 3))
+        self.disk = clamp(self.disk + rng.gauss(0.01, 0.2))
+
+    def state_doc(self, now):
+        """miner_states document in the shape setupMinerStateListener reads"""
+        idle = self.status in IDLE_STATUSES
+        return {
+            'miner_id': self.miner_id,
+            'current_status': self.status,
+            'current_metrics': {
+                'metrics': {
+                    'cpu_usage': 0 if idle else round(self.cpu, 1),
+                    'memory_usage': 0 if idle else round(self.memory, 1),
+                    'disk_usage': round(self.disk, 1),
+                },
+                'system_info': {'os_version': self.os_version, 'hostname': self.hostname},
+            },
+            'heartbeat_count': self.heartbeats,
+            'last_heartbeat': firestore_timestamp(now),
+        }
+
+
+class JsonlSink:
+    """Append each state document as one JSON line"""
+
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'a', encoding='utf-8')
+
+    async def write(self, docs):
+        self.file.write(''.join(json.dumps(doc, separators=(',', ':')) + '\n' for doc in docs))
+
+    async def close(self):
+        self.file.flush()
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class StandinSink:
+    """Write batches into miner_states on a running firestore_standin.py"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.client = None
+
+    async def write(self, docs):
+        if self.client is None:
+            from firestore_standin import Client
+            self.client = await Client(self.host, self.port).connect()
+        await self.client.batch([{'collection': 'miner_states', 'doc': doc['miner_id'], 'data': doc}
+                                 for doc in docs])
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+
+class NullSink:
+    """Discard everything; measures the generator on its own"""
+
+    async def write(self, docs):
+        pass
+
+    async def close(self):
+        pass
+
+
+class LoadGenerator:
+    """Drive heartbeats for a fleet from a single timer heap on one event loop"""
+
+    def __init__(self, miners, rate, sink, jitter=0.1, outage_rate=0.0, outage_seconds=30.0,
+                 flip_rate=0.0, batch_size=500, flush_interval=0.05, seed=0):
+        self.rng = random.Random(seed)
+        self.miners = [Miner(index, self.rng) for index in range(miners)]
+        self.period = 1.0 / rate
+        self.sink = sink
+        self.jitter = jitter
+        self.outage_rate = outage_rate
+        self.outage_seconds = outage_seconds
+        self.flip_rate = flip_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sent = 0
+        self.skew = Reservoir(self.rng)
+
+    def next_due(self, due):
+        return due + self.period * (1 + self.jitter * self.rng.uniform(-1, 1))
+
+    def beat(self, miner, now, wall):
+        """Advance one miner by one heartbeat; returns its doc or None when silent"""
+        rng = self.rng
+        if miner.outage_until:
+            if now < miner.outage_until:
+                return None
+            # Back to whatever it was doing, not necessarily online
+            miner.outage_until = 0.0
+            miner.status, miner.status_before_outage = miner.status_before_outage, None
+        elif self.outage_rate and rng.random() < self.outage_rate:
+            # The backend flags the miner offline once, then it goes quiet
+            miner.outage_until = now + self.outage_seconds
+            miner.status_before_outage = miner.status
+            miner.status = 'offline'
+            return miner.state_doc(wall)
+        if self.flip_rate and rng.random() < self.flip_rate:
+            miner.status = rng.choice([status for status in STATUSES if status != miner.status])
+        miner.step(rng)
+        miner.heartbeats += 1
+        return miner.state_doc(wall)
+
+    async def run(self, duration):
+        clock = time.perf_counter
+        start = clock()
+        wall_offset = time.time() - start
+        end = start + duration
+        # Spread first heartbeats over one period to avoid a thundering herd
+        heap = [(start + self.rng.uniform(0, self.period), index)
+                for index in range(len(self.miners))]
+        heapq.heapify(heap)
+        batch, last_flush = [], start
+
+        while True:
+            now = clock()
+            if now >= end:
+                break
+            due, index = heap[0]
+            if due > now:
+                if batch and now - last_flush >= self.flush_interval:
+                    await self.sink.write(batch)
+                    self.sent += len(batch)
+                    batch, last_flush = [], clock()
+                await asyncio.sleep(min(due - now, self.flush_interval, end - now))
+                continue
+            heapq.heapreplace(heap, (self.next_due(due), index))
+            self.skew.add(now - due)
+            doc = self.beat(self.miners[index], now, now + wall_offset)
+            if doc is not None:
+                batch.append(doc)
+            if len(batch) >= self.batch_size:
+                await self.sink.write(batch)
+                self.sent += len(batch)
+                batch, last_flush = [], clock()
+
+        if batch:
+            await self.sink.write(batch)
+            self.sent += len(batch)
+        await self.sink.close()
+        return self.report(clock() - start)
+
+    def report(self, elapsed):
+        statuses = {}
+        for miner in self.miners:
+            statuses[miner.status] = statuses.get(miner.status, 0) + 1
+        return {
+            'miners': len(self.miners),
+            'elapsed_s': round(elapsed, 3),
+            'heartbeats': self.sent,
+            'target_per_s': round(len(self.miners) / self.period, 1),
+            'achieved_per_s': round(self.sent / elapsed, 1) if elapsed else 0.0,
+            'skew_ms': self.skew.summary_ms(),
+            'statuses': statuses,
+        }
+
+def make_sink(args):
+    if args.sink == 'standin':
+        return StandinSink(args.host, args.port)
+    if args.sink == 'null':
+        return NullSink()
+    return JsonlSink(args.output)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate miner_states heartbeats for a large fleet")
+    parser.add_argument('--miners', type=int, default=10_000)
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="heartbeats per miner per second (default: 1)")
+    parser.add_argument('--duration', type=float, default=10.0, metavar='SECONDS')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help="+/- fraction of the period applied to each interval (default: 0.1)")
+    parser.add_argument('--outage-rate', type=float, default=0.0,
+                        help="per-heartbeat probability that a miner drops offline")
+    parser.add_argument('--outage-seconds', type=float, default=30.0)
+    parser.add_argument('--flip-rate', type=float, default=0.0,
+                        help="per-heartbeat probability of a random status change")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--flush-interval', type=float, default=0.05, metavar='SECONDS')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sink', choices=['jsonl', 'standin', 'null'], default='jsonl')
+    parser.add_argument('--output', default='heartbeats.jsonl',
+                        help="JSONL sink path, '-' for stdout (default: heartbeats.jsonl)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    args = parser.parse_args(argv)
+
+    generator = LoadGenerator(args.miners, args.rate, make_sink(args), args.jitter,
+                              args.outage_rate, args.outage_seconds, args.flip_rate,
+                              args.batch_size, args.flush_interval, args.seed)
+    report = asyncio.run(generator.run(args.duration))
+    print(json.dumps(report, indent=2), file=sys.stderr if args.output == '-' else sys.stdout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import mmap
+import random
+import struct
+import sys
+import time
+
+from heartbeat_loadgen import LoadGenerator, Reservoir, make_sink
+
+# File header: magic, format version, wall clock of the first event (epoch µs)
+MAGIC = b'HBTRACE\x00'
+VERSION = 1
+HEADER = struct.Struct('<8sHq')
+# A string (miner id, status, OS, hostname) is defined once, before its first use
+TAG_STRING = 1
+STRING = struct.Struct('<BIH')
+# One miner_states update: µs since the first event, then the document fields
+TAG_STATE = 2
+STATE = struct.Struct('<BQIIIIHHHIII')
+NO_STRING = 0xFFFFFFFF
+NO_METRIC = 0xFFFF
+# Metrics are stored in hundredths of a percent
+METRIC_SCALE = 100
+METRICS = ('cpu_usage', 'memory_usage', 'disk_usage')
+MIN_SPEED, MAX_SPEED = 1.0, 1000.0
+
+
+def event_us(doc):
+    """Epoch microseconds of the heartbeat behind a miner_states document, or None"""
+    heartbeat = doc.get('last_heartbeat')
+    if not isinstance(heartbeat, dict) or heartbeat.get('seconds') is None:
+        return None
+    return heartbeat['seconds'] * 1_000_000 + (heartbeat.get('nanoseconds') or 0) // 1000
+
+def pack_metric(value):
+    if value is None:
+        return NO_METRIC
+    return min(NO_METRIC - 1, max(0, round(value * METRIC_SCALE)))
+
+
+class TraceWriter:
+    """Append miner_states updates to a binary trace.
+
+    Only the fields Dashboard.jsx reads are kept, at 43 bytes per update plus
+    each distinct string once. Events are timed by their last_heartbeat (by
+    arrival when it is missing) and never go backwards, so the player can
+    pace them in file order. It has the heartbeat_loadgen sink interface.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.strings = {}
+        self.origin = None
+        self.last = 0
+        self.records = 0
+
+    def intern(self, value):
+        if value is None:
+            return NO_STRING
+        string_id = self.strings.get(value)
+        if string_id is None:
+            string_id = self.strings[value] = len(self.strings)
+            data = str(value).encode('utf-8')
+            self.file.write(STRING.pack(TAG_STRING, string_id, len(data)) + data)
+        return string_id
+
+    def add(self, doc):
+        when = event_us(doc)
+        if when is None:
+            when = time.time_ns() // 1000
+        if self.origin is None:
+            self.origin = when
+            self.file.write(HEADER.pack(MAGIC, VERSION, when))
+        # Out-of-order heartbeats are replayed at the time of the one before them
+        self.last = max(self.last, when - self.origin)
+        heartbeat = doc.get('last_heartbeat') or {}
+        current = doc.get('current_metrics') or {}
+        metrics = current.get('metrics') or {}
+        system = current.get('system_info') or {}
+        self.file.write(STATE.pack(
+            TAG_STATE, self.last, self.intern(doc['miner_id']), doc.get('heartbeat_count') or 0,
+            heartbeat.get('seconds') or 0, heartbeat.get('nanoseconds') or 0,
+            *(pack_metric(metrics.get(name)) for name in METRICS),
+            self.intern(doc.get('current_status')), self.intern(system.get('os_version')),
+            self.intern(system.get('hostname'))))
+        self.records += 1
+
+    async def write(self, docs):
+        for doc in docs:
+            self.add(doc)
+
+    async def close(self):
+        if self.origin is None:
+            # An empty recording still gets a valid header
+            self.file.write(HEADER.pack(MAGIC, VERSION, time.time_ns() // 1000))
+        self.file.close()
+
+
+class TraceReader:
+    """Memory-mapped view of a trace; pages are read in as playback reaches them"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a heartbeat trace")
+        magic, version, self.origin = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} heartbeat trace")
+        if hasattr(self.map, 'madvise'):
+            self.map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def events(self):
+        """Yield (µs since the first event, miner_states document) in file order"""
+        for record, strings in self.records():
+            yield record[1], self.document(record, strings)
+
+    def records(self):
+        """Yield (raw state record, string table so far) in file order.
+
+        A record cut short by a recorder that died mid-write ends the trace.
+        """
+        data, size = self.map, len(self.map)
+        strings = []
+        offset = HEADER.size
+        while offset < size:
+            tag = data[offset]
+            if tag == TAG_STRING:
+                if offset + STRING.size > size:
+                    return
+                _, string_id, length = STRING.unpack_from(data, offset)
+                offset += STRING.size
+                if offset + length > size:
+                    return
+                strings.append(data[offset:offset + length].decode('utf-8'))
+                offset += length
+            elif tag == TAG_STATE:
+                if offset + STATE.size > size:
+                    return
+                record = STATE.unpack_from(data, offset)
+                offset += STATE.size
+                yield record, strings
+            else:
+                raise ValueError(f"corrupt trace: unknown record tag {tag} at byte {offset}")
+
+    @staticmethod
+    def document(record, strings):
+        """The miner_states document in the shape setupMinerStateListener reads"""
+        _, _, miner, count, seconds, nanoseconds, *rest = record
+        values, (status, os_version, hostname) = rest[:len(METRICS)], rest[len(METRICS):]
+        def string(string_id):
+            return None if string_id == NO_STRING else strings[string_id]
+        system_info = {}
+        if os_version != NO_STRING:
+            system_info['os_version'] = string(os_version)
+        if hostname != NO_STRING:
+            system_info['hostname'] = string(hostname)
+        return {
+            'miner_id': strings[miner],
+            'current_status': string(status),
+            'current_metrics': {
+                'metrics': {name: value / METRIC_SCALE
+                            for name, value in zip(METRICS, values) if value != NO_METRIC},
+                'system_info': system_info,
+            },
+            'heartbeat_count': count,
+            'last_heartbeat': {'seconds': seconds, 'nanoseconds': nanoseconds},
+        }
+
+
+class Player:
+    """Replay a trace into a sink with its original spacing divided by speed.
+
+    Updates due at the same moment go out as one batch. Lateness is measured
+    from each update's due time to the write that carried it.
+    """
+
+    def __init__(self, reader, sink, speed=1.0, batch_size=500, seed=0):
+        self.reader = reader
+        self.sink = sink
+        self.speed = speed
+        self.batch_size = batch_size
+        self.sent = 0
+        self.lateness = Reservoir(random.Random(seed))
+
+    async def send(self, batch, dues):
+        await self.sink.write(batch)
+        written = time.perf_counter()
+        for due in dues:
+            self.lateness.add(max(0.0, written - due))
+        self.sent += len(batch)
+
+    async def run(self):
+        clock = time.perf_counter
+        start = clock()
+        batch, dues = [], []
+        trace_us = 0
+        for trace_us, doc in self.reader.events():
+            due = start + trace_us / 1e6 / self.speed
+            if due > clock():
+                if batch:
+                    await self.send(batch, dues)
+                    batch, dues = [], []
+                delay = due - clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            batch.append(doc)
+            dues.append(due)
+            if len(batch) >= self.batch_size:
+                await self.send(batch, dues)
+                batch, dues = [], []
+        if batch:
+            await self.send(batch, dues)
+        await self.sink.close()
+        return self.report(clock() - start, trace_us / 1e6)
+
+    def report(self, elapsed, traced):
+        return {
+            'updates': self.sent,
+            'speed': self.speed,
+            'trace_s': round(traced, 3),
+            'target_s': round(traced / self.speed, 3),
+            'elapsed_s': round(elapsed, 3),
+            'achieved_per_s': round(self.sent / elapsed, 1) if elapsed else 0.0,
+            'lateness_ms': self.lateness.summary_ms(),
+        }
+
+
+def describe(path):
+    """Summary of a trace without building any documents"""
+    reader = TraceReader(path)
+    try:
+        updates, miners, last = 0, set(), 0
+        for record, _ in reader.records():
+            updates += 1
+            # Miners are counted by string id; nothing is decoded
+            miners.add(record[2])
+            last = record[1]
+        size = len(reader.map)
+        return {'updates': updates, 'miners': len(miners), 'duration_s': round(last / 1e6, 3),
+                'started_at': reader.origin / 1e6, 'bytes': size,
+                'bytes_per_update': round(size / updates, 1) if updates else 0.0}
+    finally:
+        reader.close()
+
+async def record_standin(writer, host, port, duration):
+    """Record every miner_states change seen by a stand-in listener"""
+    from firestore_standin import Client
+
+    client = await Client(host, port).connect()
+
+    def on_states(message):
+        for change in message['changes']:
+            if change['type'] != 'removed':
+                writer.add(change['data'])
+
+    try:
+        await client.listen('miner_states', [], on_states)
+        await asyncio.sleep(duration)
+    finally:
+        await client.close()
+        await writer.close()
+
+def speed_value(text):
+    speed = float(text)
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise argparse.ArgumentTypeError(f"speed must be between {MIN_SPEED:g}x and {MAX_SPEED:g}x")
+    return speed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay miner_states heartbeat traces")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="record updates into a binary trace")
+    record.add_argument('trace')
+    source = record.add_mutually_exclusive_group()
+    source.add_argument('--input', metavar='FILE', help="convert a miner_states JSONL file, '-' for stdin")
+    source.add_argument('--standin', metavar='HOST:PORT',
+                        help="record miner_states changes from a running firestore_standin.py")
+    record.add_argument('--duration', type=float, default=10.0, metavar='SECONDS',
+                        help="how long to record or generate (default: 10)")
+    record.add_argument('--miners', type=int, default=1000, help="generated fleet size (default: 1000)")
+    record.add_argument('--rate', type=float, default=1.0, help="generated heartbeats per miner per second")
+    record.add_argument('--flip-rate', type=float, default=0.001)
+    record.add_argument('--outage-rate', type=float, default=0.0)
+    record.add_argument('--seed', type=int, default=0)
+
+    play = commands.add_parser('play', help="replay a trace into a sink")
+    play.add_argument('trace')
+    play.add_argument('--speed', type=speed_value, default=1.0,
+                      help=f"time compression, {MIN_SPEED:g} to {MAX_SPEED:g} (default: 1)")
+    play.add_argument('--batch-size', type=int, default=500)
+    play.add_argument('--sink', choices=['jsonl', 'standin', 'null'], default='null')
+    play.add_argument('--output', default='heartbeats.jsonl',
+                      help="JSONL sink path, '-' for stdout (default: heartbeats.jsonl)")
+    play.add_argument('--host', default='127.0.0.1')
+    play.add_argument('--port', type=int, default=8787)
+
+    info = commands.add_parser('info', help="summarize a trace")
+    info.add_argument('trace')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        report = describe(args.trace)
+    elif args.command == 'play':
+        reader = TraceReader(args.trace)
+        try:
+            report = asyncio.run(Player(reader, make_sink(args), args.speed, args.batch_size).run())
+        finally:
+            reader.close()
+    else:
+        writer = TraceWriter(args.trace)
+        if args.input:
+            source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+            with source:
+                for line in source:
+                    if line.strip():
+                        writer.add(json.loads(line))
+            asyncio.run(writer.close())
+        elif args.standin:
+            host, _, port = args.standin.rpartition(':')
+            asyncio.run(record_standin(writer, host or '127.0.0.1', int(port), args.duration))
+        else:
+            generator = LoadGenerator(args.miners, args.rate, writer, outage_rate=args.outage_rate,
+                                      flip_rate=args.flip_rate, seed=args.seed)
+            asyncio.run(generator.run(args.duration))
+        report = {'updates': writer.records, 'strings': len(writer.strings),
+                  'duration_s': round(writer.last / 1e6, 3)}
+    print(json.dumps(report, indent=2), file=sys.stderr if getattr(args, 'output', None) == '-' else sys.stdout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import json
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("incident_engine.py needs NumPy: pip install -r requirements.txt")
+
+# Dashboard.jsx raises an incident above 90%; clearing below usageThresholds.high
+# (80 in the generated data.js) gives the hysteresis band
+ENTER_THRESHOLD = 90.0
+EXIT_THRESHOLD = 80.0
+METRICS = ('cpu_usage', 'memory_usage', 'disk_usage')
+
+OPENED, CLOSED = 1, 0
+INCIDENT_DTYPE = np.dtype([('miner', '<u4'), ('ts', '<f8'), ('kind', 'u1'),
+                           ('metric', 'u1'), ('value', '<f4')])
+
+
+def runs(flags, index, group_start, carried):
+    """Length of the run of True ending at each position, per miner group.
+
+    A run that reaches back to the start of its group continues the run
+    carried over from the previous batch.
+    """
+    last_break = np.maximum.accumulate(np.where(flags, -1, index))
+    within = last_break < group_start
+    length = index - np.maximum(last_break, group_start - 1)
+    return np.where(flags, length + np.where(within, carried, 0), 0)
+
+
+class IncidentEngine:
+    """Evaluate incident rules over heartbeat batches with per-miner hysteresis.
+
+    An incident opens once the peak of cpu/memory/disk usage has been at or
+    above `enter` for `enter_after` consecutive heartbeats, and closes after
+    `exit_after` consecutive heartbeats below `exit`. Values in between keep
+    the current state, so a miner hovering around 90% does not flap.
+    """
+
+    def __init__(self, enter=ENTER_THRESHOLD, exit=EXIT_THRESHOLD, enter_after=3, exit_after=2):
+        if exit > enter:
+            raise ValueError("exit threshold must not be above the enter threshold")
+        self.enter = enter
+        self.exit = exit
+        self.enter_after = enter_after
+        self.exit_after = exit_after
+        self.active = np.zeros(0, dtype=bool)
+        self.run_above = np.zeros(0, dtype=np.int64)
+        self.run_below = np.zeros(0, dtype=np.int64)
+
+    def reserve(self, size):
+        if size > len(self.active):
+            grow = max(size, 2 * len(self.active)) - len(self.active)
+            self.active = np.concatenate([self.active, np.zeros(grow, dtype=bool)])
+            self.run_above = np.concatenate([self.run_above, np.zeros(grow, dtype=np.int64)])
+            self.run_below = np.concatenate([self.run_below, np.zeros(grow, dtype=np.int64)])
+
+    def evaluate(self, miner, ts, cpu, memory, disk):
+        """Process one batch and return its incident transitions.
+
+        miner holds dense integer miner indices; rows must be in time order
+        for each miner, which a heartbeat stream already is.
+        """
+        miner = np.asarray(miner, dtype=np.int64)
+        if not len(miner):
+            return np.zeros(0, dtype=INCIDENT_DTYPE)
+        self.reserve(int(miner.max()) + 1)
+        usage = np.stack([np.asarray(cpu, dtype=np.float32), np.asarray(memory, dtype=np.float32),
+                          np.asarray(disk, dtype=np.float32)])
+
+        # Group rows by miner, keeping arrival order inside each group
+        order = np.argsort(miner, kind='stable')
+        m = miner[order]
+        usage = usage[:, order]
+        metric = usage.argmax(axis=0)
+        peak = usage.max(axis=0)
+        count = len(m)
+        index = np.arange(count)
+        is_start = np.empty(count, dtype=bool)
+        is_start[0] = True
+        np.not_equal(m[1:], m[:-1], out=is_start[1:])
+        group_start = np.maximum.accumulate(np.where(is_start, index, 0))
+
+        above = peak >= self.enter
+        below = peak < self.exit
+        run_above = runs(above, index, group_start, self.run_above[m])
+        run_below = runs(below, index, group_start, self.run_below[m])
+        turn_on = run_above >= self.enter_after
+        turn_off = run_below >= self.exit_after
+
+        # State after each row is set by the latest decisive row in its group
+        last_decisive = np.maximum.accumulate(np.where(turn_on | turn_off, index, -1))
+        decided = last_decisive >= group_start
+        state = np.where(decided, turn_on[np.maximum(last_decisive, 0)], self.active[m])
+        previous = np.empty(count, dtype=bool)
+        previous[1:] = state[:-1]
+        previous[is_start] = self.active[m[is_start]]
+
+        # Carry per-miner state into the next batch from each group's last row
+        is_end = np.empty(count, dtype=bool)
+        is_end[-1] = True
+        np.not_equal(m[1:], m[:-1], out=is_end[:-1])
+        ends = m[is_end]
+        self.active[ends] = state[is_end]
+        self.run_above[ends] = run_above[is_end]
+        self.run_below[ends] = run_below[is_end]
+
+        changed = np.flatnonzero(state != previous)
+        incidents = np.empty(len(changed), dtype=INCIDENT_DTYPE)
+        incidents['miner'] = m[changed]
+        incidents['ts'] = np.asarray(ts, dtype=np.float64)[order][changed]
+        incidents['kind'] = np.where(state[changed], OPENED, CLOSED)
+        incidents['metric'] = metric[changed]
+        incidents['value'] = peak[changed]
+        return incidents[np.argsort(incidents['ts'], kind='stable')]
+
+    def open_incidents(self):
+        return np.flatnonzero(self.active)
+
+
+class MinerIndex:
+    """Map miner ids to the dense integers the engine keys its state by"""
+
+    def __init__(self):
+        self.ids = []
+        self.positions = {}
+
+    def lookup(self, miner_id):
+        position = self.positions.get(miner_id)
+        if position is None:
+            position = self.positions[miner_id] = len(self.ids)
+            self.ids.append(miner_id)
+        return position
+
+
+def read_batches(lines, miners, batch_size):
+    """Turn miner_states JSON lines into column batches"""
+    columns = ([], [], [], [], [])
+    for line in lines:
+        doc = json.loads(line)
+        metrics = doc.get('current_metrics', {}).get('metrics', {})
+        heartbeat = doc.get('last_heartbeat') or {}
+        columns[0].append(miners.lookup(doc['miner_id']))
+        columns[1].append(heartbeat.get('seconds', 0) + heartbeat.get('nanoseconds', 0) / 1e9)
+        for column, name in zip(columns[2:], METRICS):
+            column.append(metrics.get(name) or 0)
+        if len(columns[0]) >= batch_size:
+            yield columns
+            columns = ([], [], [], [], [])
+    if columns[0]:
+        yield columns
+
+def incident_records(incidents, miners):
+    for row in incidents.tolist():
+        miner, ts, kind, metric, value = row
+        yield {'miner_id': miners.ids[miner], 'ts': ts, 'event': 'opened' if kind == OPENED else 'closed',
+               'metric': METRICS[metric], 'value': round(value, 1)}
+
+def benchmark(engine, heartbeats, miners, batch_size, seed=0):
+    """Time the engine alone on synthetic usage that hovers around the thresholds"""
+    rng = np.random.default_rng(seed)
+    elapsed = produced = 0
+    for offset in range(0, heartbeats, batch_size):
+        size = min(batch_size, heartbeats - offset)
+        miner = rng.integers(0, miners, size)
+        ts = offset + np.arange(size, dtype=np.float64)
+        cpu, memory, disk = (rng.normal(80, 10, size).astype(np.float32) for _ in range(3))
+        started = time.perf_counter()
+        produced += len(engine.evaluate(miner, ts, cpu, memory, disk))
+        elapsed += time.perf_counter() - started
+    return {'heartbeats': heartbeats, 'miners': miners, 'batch_size': batch_size,
+            'elapsed_s': round(elapsed, 3), 'heartbeats_per_s': round(heartbeats / elapsed),
+            'transitions': produced, 'open_incidents': int(len(engine.open_incidents()))}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect incidents over miner heartbeat streams")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="miner_states JSONL, e.g. from heartbeat_loadgen.py (default: stdin)")
+    parser.add_argument('--output', default='-', help="incident JSONL (default: stdout)")
+    parser.add_argument('--enter', type=float, default=ENTER_THRESHOLD)
+    parser.add_argument('--exit', type=float, default=EXIT_THRESHOLD)
+    parser.add_argument('--enter-after', type=int, default=3, metavar='N',
+                        help="consecutive heartbeats above --enter before opening (default: 3)")
+    parser.add_argument('--exit-after', type=int, default=2, metavar='N',
+                        help="consecutive heartbeats below --exit before closing (default: 2)")
+    parser.add_argument('--batch-size', type=int, default=65536)
+    parser.add_argument('--bench', type=int, metavar='HEARTBEATS',
+                        help="skip input and time the engine on synthetic heartbeats")
+    parser.add_argument('--bench-miners', type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    engine = IncidentEngine(args.enter, args.exit, args.enter_after, args.exit_after)
+    if args.bench:
+        print(json.dumps(benchmark(engine, args.bench, args.bench_miners, args.batch_size), indent=2))
+        return
+
+    miners = MinerIndex()
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    with source, sink:
+        for batch in read_batches(source, miners, args.batch_size):
+            incidents = engine.evaluate(*batch)
+            sink.writelines(json.dumps(record) + '\n' for record in incident_records(incidents, miners))
+
+if __name__ == "__main__":
+    main()
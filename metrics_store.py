@@ -0,0 +1,345 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("metrics_store.py needs NumPy: pip install -r requirements.txt")
+
+METRICS = ('cpu', 'memory', 'disk')
+RAW_COLUMNS = {'ts': '<i8', 'cpu': '<f4', 'memory': '<f4', 'disk': '<f4'}
+ROLLUP_COLUMNS = {'ts': '<i8', 'count': '<u4'}
+for _metric in METRICS:
+    ROLLUP_COLUMNS.update({f'{_metric}_min': '<f4', f'{_metric}_max': '<f4', f'{_metric}_sum': '<f8'})
+
+# Rollup bucket widths in seconds: minute, hour, day
+RESOLUTIONS = (60, 3600, 86400)
+DAY_MS = 86_400_000
+# How long each series is kept by default; None keeps it forever
+RETENTION_MS = {'raw': 7 * DAY_MS, 60: 30 * DAY_MS, 3600: 400 * DAY_MS, 86400: None}
+DURATION = re.compile(r'^(\d+)([smhd])$')
+UNIT_MS = {'s': 1000, 'm': 60_000, 'h': 3_600_000, 'd': DAY_MS}
+
+
+class Series:
+    """Fixed-width column files that are appended together and read via mmap"""
+
+    def __init__(self, directory, columns):
+        self.directory = directory
+        self.columns = columns
+        self.maps = {}
+        self.recover()
+        # The directory only appears with the first append, so reads never create it
+        self.length = self.repair()
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.col")
+
+    @property
+    def staged(self):
+        return self.directory + '.compact'
+
+    @property
+    def retired(self):
+        return self.directory + '.old'
+
+    def recover(self):
+        """Finish or discard a drop_before() that was interrupted"""
+        if not os.path.isdir(self.directory) and os.path.isdir(self.retired):
+            # Interrupted between the two renames: the staged columns are complete
+            os.rename(self.staged, self.directory)
+        for leftover in (self.staged, self.retired):
+            if os.path.isdir(leftover):
+                shutil.rmtree(leftover)
+
+    def repair(self):
+        """Trim columns to a common length after an interrupted append"""
+        lengths = []
+        for name, dtype in self.columns.items():
+            path = self.path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        length = min(lengths)
+        for (name, dtype), current in zip(self.columns.items(), lengths):
+            # Missing files are simply created by the first append
+            if current != length:
+                with open(self.path(name), 'r+b') as file:
+                    file.truncate(length * np.dtype(dtype).itemsize)
+        return length
+
+    def __len__(self):
+        return self.length
+
+    def column(self, name):
+        """Read-only memory map of a column (zero-copy; slices stay views)"""
+        cached = self.maps.get(name)
+        if cached is not None and len(cached) == self.length:
+            return cached
+        if not self.length:
+            return np.zeros(0, dtype=self.columns[name])
+        column = np.memmap(self.path(name), dtype=self.columns[name], mode='r', shape=(self.length,))
+        self.maps[name] = column
+        return column
+
+    def append(self, rows):
+        count = len(rows['ts'])
+        if not count:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for name, dtype in self.columns.items():
+            with open(self.path(name), 'ab') as file:
+                file.write(np.ascontiguousarray(rows[name], dtype=dtype).tobytes())
+        self.length += count
+
+    def replace_last(self, row):
+        """Overwrite the final row in place (used for the still-open rollup bucket)"""
+        for name, dtype in self.columns.items():
+            with open(self.path(name), 'r+b') as file:
+                file.seek(-np.dtype(dtype).itemsize, os.SEEK_END)
+                file.write(np.asarray([row[name]], dtype=dtype).tobytes())
+        self.maps.clear()
+
+    def last_row(self):
+        return {name: self.column(name)[-1] for name in self.columns} if self.length else None
+
+    def span(self, start, end):
+        """Index range of rows with start <= ts < end"""
+        ts = self.column('ts')
+        return int(np.searchsorted(ts, start, 'left')), int(np.searchsorted(ts, end, 'left'))
+
+    def rows(self, start, end):
+        first, last = self.span(start, end)
+        return {name: self.column(name)[first:last] for name in self.columns}
+
+    def drop_before(self, cutoff):
+        """Rewrite every column without the rows older than cutoff, all or nothing.
+
+        The shortened columns are staged in a sibling directory that replaces
+        this one by rename, so a crash never leaves columns of mixed ages;
+        recover() completes or discards the swap on the next open.
+        """
+        first, _ = self.span(cutoff, cutoff)
+        if not first:
+            return 0
+        if os.path.isdir(self.staged):
+            shutil.rmtree(self.staged)
+        os.makedirs(self.staged)
+        for name in self.columns:
+            self.column(name)[first:].tofile(os.path.join(self.staged, f"{name}.col"))
+        self.maps.clear()
+        os.rename(self.directory, self.retired)
+        os.rename(self.staged, self.directory)
+        shutil.rmtree(self.retired)
+        self.length -= first
+        return first
+
+
+def rollup(ts, values, width_ms):
+    """Aggregate sorted raw rows into buckets of width_ms"""
+    buckets = ts - ts % width_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    rows = {'ts': buckets[starts], 'count': np.diff(np.r_[starts, len(ts)]).astype(np.uint32)}
+    for metric in METRICS:
+        column = values[metric]
+        rows[f'{metric}_min'] = np.minimum.reduceat(column, starts)
+        rows[f'{metric}_max'] = np.maximum.reduceat(column, starts)
+        rows[f'{metric}_sum'] = np.add.reduceat(column.astype(np.float64), starts)
+    return rows
+
+def merge_rows(existing, new):
+    merged = {'ts': existing['ts'], 'count': existing['count'] + new['count']}
+    for metric in METRICS:
+        merged[f'{metric}_min'] = min(existing[f'{metric}_min'], new[f'{metric}_min'])
+        merged[f'{metric}_max'] = max(existing[f'{metric}_max'], new[f'{metric}_max'])
+        merged[f'{metric}_sum'] = existing[f'{metric}_sum'] + new[f'{metric}_sum']
+    return merged
+
+
+class MinerHistory:
+    """Raw samples and rollups for one miner"""
+
+    def __init__(self, directory, resolutions=RESOLUTIONS):
+        self.raw = Series(os.path.join(directory, 'raw'), RAW_COLUMNS)
+        self.rollups = {width: Series(os.path.join(directory, f'rollup-{width}'), ROLLUP_COLUMNS)
+                        for width in resolutions}
+
+    def append(self, ts, cpu, memory, disk):
+        order = np.argsort(ts, kind='stable')
+        ts = np.asarray(ts, dtype=np.int64)[order]
+        if len(self.raw) and len(ts) and ts[0] < self.raw.column('ts')[-1]:
+            raise ValueError("history is append-only; timestamps must not go backwards")
+        values = {'cpu': np.asarray(cpu, dtype=np.float32)[order],
+                  'memory': np.asarray(memory, dtype=np.float32)[order],
+                  'disk': np.asarray(disk, dtype=np.float32)[order]}
+        self.raw.append({'ts': ts, **values})
+        for width, series in self.rollups.items():
+            rows = rollup(ts, values, width * 1000)
+            last = series.last_row()
+            if last is not None and last['ts'] == rows['ts'][0]:
+                # The newest bucket is still filling up; fold the first group into it
+                series.replace_last(merge_rows(last, {name: column[0] for name, column in rows.items()}))
+                rows = {name: column[1:] for name, column in rows.items()}
+            series.append(rows)
+
+    def covers(self, width, start, end):
+        """Whether the series at width ('raw' or seconds) still holds every row in [start, end).
+
+        Compaction drops the oldest rows of the finer series first; they are
+        missing when a coarser series has whole buckets from before them.
+        """
+        series = self.raw if width == 'raw' else self.rollups[width]
+        oldest = series.column('ts')[0] if len(series) else None
+        if oldest is not None and oldest <= start:
+            return True
+        finer = 0 if width == 'raw' else width
+        for coarser_width, coarser in self.rollups.items():
+            if coarser_width <= finer:
+                continue
+            limit = end if oldest is None else oldest - oldest % (coarser_width * 1000)
+            first, last = coarser.span(start, min(limit, end))
+            if last > first:
+                return False
+        return True
+
+    def query(self, start, end, max_points=1000):
+        """Rows for [start, end) from the finest series that fits in max_points and is not compacted away"""
+        first, last = self.raw.span(start, end)
+        if last - first <= max_points and self.covers('raw', start, end):
+            return 'raw', {name: self.raw.column(name)[first:last] for name in RAW_COLUMNS}
+        for width, series in sorted(self.rollups.items()):
+            if (((end - start) / (width * 1000) <= max_points and self.covers(width, start, end))
+                    or width == max(self.rollups)):
+                rows = series.rows(start, end)
+                count = np.maximum(rows['count'], 1)
+                for metric in METRICS:
+                    rows[f'{metric}_mean'] = rows[f'{metric}_sum'] / count
+                return width, rows
+
+    def compact(self, now, retention=None):
+        """Drop rows older than each series' retention window"""
+        retention = RETENTION_MS if retention is None else retention
+        dropped = {}
+        for key, series in [('raw', self.raw), *self.rollups.items()]:
+            keep = retention.get(key)
+            if keep is not None:
+                dropped[key] = series.drop_before(now - keep)
+        return dropped
+
+
+class MetricsStore:
+    """Per-miner metric history under one root directory"""
+
+    def __init__(self, root, resolutions=RESOLUTIONS):
+        self.root = root
+        self.resolutions = resolutions
+        self.miners = {}
+
+    def miner_path(self, miner_id):
+        return os.path.join(self.root, re.sub(r'[^\w.-]', '_', miner_id))
+
+    def miner(self, miner_id):
+        if miner_id not in self.miners:
+            self.miners[miner_id] = MinerHistory(self.miner_path(miner_id), self.resolutions)
+        return self.miners[miner_id]
+
+    def miner_ids(self):
+        return sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+
+    def append(self, miner_id, ts, cpu, memory, disk):
+        self.miner(miner_id).append(ts, cpu, memory, disk)
+
+    def query(self, miner_id, start, end, max_points=1000):
+        """(resolution, rows) for one miner; an unknown miner has no raw rows"""
+        if miner_id not in self.miners and not os.path.isdir(self.miner_path(miner_id)):
+            return 'raw', {name: np.zeros(0, dtype=dtype) for name, dtype in RAW_COLUMNS.items()}
+        return self.miner(miner_id).query(start, end, max_points)
+
+    def compact(self, now=None, retention=None):
+        now = int(time.time() * 1000) if now is None else now
+        return {miner_id: self.miner(miner_id).compact(now, retention) for miner_id in self.miner_ids()}
+
+
+def ingest(store, lines, batch_size=100_000):
+    """Append miner_states JSON lines, grouped per miner in batches"""
+    pending, total = {}, 0
+
+    def flush():
+        for miner_id, (ts, cpu, memory, disk) in pending.items():
+            store.append(miner_id, ts, cpu, memory, disk)
+        pending.clear()
+
+    for count, line in enumerate(lines, 1):
+        doc = json.loads(line)
+        metrics = doc.get('current_metrics', {}).get('metrics', {})
+        heartbeat = doc.get('last_heartbeat') or {}
+        ts = heartbeat.get('seconds', 0) * 1000 + heartbeat.get('nanoseconds', 0) // 1_000_000
+        columns = pending.setdefault(doc['miner_id'], ([], [], [], []))
+        columns[0].append(ts)
+        columns[1].append(metrics.get('cpu_usage') or 0)
+        columns[2].append(metrics.get('memory_usage') or 0)
+        columns[3].append(metrics.get('disk_usage') or 0)
+        total = count
+        if count % batch_size == 0:
+            flush()
+    flush()
+    return total
+
+def parse_retention(spec):
+    """Parse 'raw=7d,60=30d,3600=400d' into a retention table"""
+    retention = dict(RETENTION_MS)
+    for item in filter(None, spec.split(',')):
+        key, _, value = item.partition('=')
+        key = key if key == 'raw' else int(key)
+        if value == 'forever':
+            retention[key] = None
+            continue
+        match = DURATION.match(value)
+        if not match:
+            raise ValueError(f"bad duration {value!r}, expected e.g. 30d")
+        retention[key] = int(match.group(1)) * UNIT_MS[match.group(2)]
+    return retention
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar per-miner metrics history")
+    parser.add_argument('--root', default='metrics-history', help="store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = commands.add_parser('ingest', help="append miner_states JSONL")
+    ingest_parser.add_argument('input', nargs='?', default='-')
+    query_parser = commands.add_parser('query', help="print a range as JSON")
+    query_parser.add_argument('miner_id')
+    query_parser.add_argument('--start', type=int, default=0, help="epoch ms (default: 0)")
+    query_parser.add_argument('--end', type=int, help="epoch ms (default: now)")
+    query_parser.add_argument('--points', type=int, default=1000)
+    compact_parser = commands.add_parser('compact', help="apply retention")
+    compact_parser.add_argument('--retention', default='',
+                                help="overrides such as raw=7d,60=30d,3600=forever")
+    args = parser.parse_args(argv)
+
+    store = MetricsStore(args.root)
+    if args.command == 'ingest':
+        started = time.perf_counter()
+        source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+        with source:
+            total = ingest(store, source)
+        print(f"Ingested {total} heartbeats in {time.perf_counter() - started:.2f}s")
+    elif args.command == 'query':
+        end = args.end if args.end is not None else int(time.time() * 1000)
+        resolution, rows = store.query(args.miner_id, args.start, end, args.points)
+        print(json.dumps({'resolution': resolution,
+                          'rows': {name: column.tolist() for name, column in rows.items()}}))
+    else:
+        try:
+            retention = parse_retention(args.retention)
+        except ValueError as error:
+            parser.error(str(error))
+        dropped = store.compact(retention=retention)
+        print(f"Compacted {len(dropped)} miners, dropped "
+              f"{sum(sum(counts.values()) for counts in dropped.values())} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from common import subscription_miner, write_atomic
+
+SNAPSHOT_COLLECTION = 'pod_snapshots'
+STATE_PATH = ".pod_snapshot_state.json"
+UNKNOWN_USER = {'displayName': 'Unknown User', 'email': 'No Email'}
+
+
+def fingerprint(*parts):
+    encoded = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def subscription_user(data):
+    return data.get('user_id') or (data.get('subscription_details') or {}).get('user_id') or ''
+
+def subscription_container(data):
+    info = data.get('container_info') or {}
+    return data.get('container_id') or info.get('container_id') or 'Unknown'
+
+def build_pod(doc_id, data, users, containers):
+    """One PodsView row with its user and SSH key already joined in, or None if skipped"""
+    info = data.get('container_info') or {}
+    container_id = subscription_container(data)
+    status = data.get('status') or info.get('status') or ''
+    # Same exclusions as PodsView: self-referencing docs and "running" placeholders
+    if doc_id == container_id or status.lower() == 'running':
+        return None
+    user_id = subscription_user(data)
+    ssh_key = (data.get('ssh_key') or info.get('ssh_key')
+               or (containers.get(container_id) or {}).get('ssh_key') or '')
+    user = users.get(user_id) if user_id else None
+    return {
+        'id': doc_id,
+        'containerId': container_id,
+        'container_info': info,
+        'status': status or 'Unknown',
+        'host': data.get('host') or info.get('host') or 'Unknown',
+        'sshPort': data.get('ssh_port') or info.get('ssh_port') or 'N/A',
+        'username': data.get('username') or info.get('username') or 'N/A',
+        'createdAt': data.get('created_at') or info.get('created_at'),
+        'expiresAt': data.get('expires_at') or info.get('expires_at'),
+        'minerId': subscription_miner(data) or 'Unknown',
+        'sshKey': ssh_key,
+        'plan': (data.get('subscription_details') or {}).get('plan') or 'standard',
+        'userId': user_id,
+        'user': ({'displayName': user.get('displayName') or UNKNOWN_USER['displayName'],
+                  'email': user.get('email') or UNKNOWN_USER['email']} if user else UNKNOWN_USER),
+    }
+
+
+class PodSnapshotJob:
+    """Join subscriptions, users and containers into one document per miner.
+
+    Each subscription's fingerprint covers its own data plus the user and
+    container documents it references, so a rerun only rebuilds the miners
+    owning a subscription whose fingerprint changed, appeared or vanished.
+    """
+
+    def __init__(self, state_path=STATE_PATH):
+        self.state_path = state_path
+        self.state = {'subscriptions': {}}
+        if os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as file:
+                self.state = json.load(file)
+
+    def run(self, subscriptions, users, containers, snapshots):
+        """Update snapshots ({miner_id: doc}) in place; returns the miners rebuilt"""
+        previous = self.state['subscriptions']
+        current, by_miner = {}, {}
+        for doc_id, data in subscriptions.items():
+            miner_id = subscription_miner(data)
+            if not miner_id:
+                continue
+            user_id = subscription_user(data)
+            container_id = subscription_container(data)
+            current[doc_id] = {
+                'miner': miner_id,
+                'fingerprint': fingerprint(data, users.get(user_id), containers.get(container_id)),
+            }
+            by_miner.setdefault(miner_id, []).append(doc_id)
+
+        affected = {entry['miner'] for doc_id, entry in current.items()
+                    if previous.get(doc_id) != entry}
+        affected |= {entry['miner'] for doc_id, entry in previous.items() if doc_id not in current}
+        # Snapshots missing for a miner, or left behind by one with no subscriptions
+        affected |= set(by_miner) ^ set(snapshots)
+
+        generated_at = int(time.time())
+        for miner_id in affected:
+            pods = [pod for doc_id in sorted(by_miner.get(miner_id, ()))
+                    if (pod := build_pod(doc_id, subscriptions[doc_id], users, containers))]
+            if miner_id not in by_miner:
+                snapshots.pop(miner_id, None)
+                continue
+            snapshots[miner_id] = {'miner_id': miner_id, 'pod_count': len(pods),
+                                   'generated_at': generated_at, 'pods': pods}
+        self.state['subscriptions'] = current
+        return affected
+
+    def save(self):
+        write_atomic(self.state_path, json.dumps(self.state).encode('utf-8'))
+
+
+def run_on_export(job, export_path, output_path):
+    with open(export_path, encoding='utf-8') as file:
+        export = json.load(file)
+    snapshots = {}
+    if os.path.exists(output_path):
+        with open(output_path, encoding='utf-8') as file:
+            snapshots = json.load(file).get(SNAPSHOT_COLLECTION, {})
+    affected = job.run(export.get('container_subscriptions', {}), export.get('users', {}),
+                       export.get('containers', {}), snapshots)
+    if affected or not os.path.exists(output_path):
+        payload = json.dumps({SNAPSHOT_COLLECTION: snapshots}, separators=(',', ':'))
+        write_atomic(output_path, payload.encode('utf-8'))
+    return affected, len(snapshots)
+
+async def run_on_standin(job, host, port):
+    from firestore_standin import Client
+
+    client = await Client(host, port).connect()
+    try:
+        # Three bulk reads replace the per-container user and key lookups
+        collections = {}
+        for name in ('container_subscriptions', 'users', 'containers', SNAPSHOT_COLLECTION):
+            collections[name] = {doc['id']: doc['data'] for doc in await client.query(name)}
+        snapshots = collections[SNAPSHOT_COLLECTION]
+        before = set(snapshots)
+        affected = job.run(collections['container_subscriptions'], collections['users'],
+                           collections['containers'], snapshots)
+        writes = [{'collection': SNAPSHOT_COLLECTION, 'doc': miner_id, 'data': snapshots[miner_id]}
+                  for miner_id in affected if miner_id in snapshots]
+        writes += [{'collection': SNAPSHOT_COLLECTION, 'doc': miner_id, 'delete': True}
+                   for miner_id in affected if miner_id in before and miner_id not in snapshots]
+        if writes:
+            await client.batch(writes)
+        return affected, len(snapshots)
+    finally:
+        await client.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute one pod snapshot document per miner for PodsView")
+    parser.add_argument('--export', metavar='FILE',
+                        help="local export shaped {collection: {doc_id: data}}")
+    parser.add_argument('--output', default='pod_snapshots.json',
+                        help="snapshot file when reading an export (default: pod_snapshots.json)")
+    parser.add_argument('--standin', metavar='HOST:PORT',
+                        help="read and write through a running firestore_standin.py instead")
+    parser.add_argument('--state', default=STATE_PATH, help="fingerprint state for incremental runs")
+    parser.add_argument('--full', action='store_true', help="ignore saved state and rebuild every miner")
+    args = parser.parse_args(argv)
+    if bool(args.export) == bool(args.standin):
+        parser.error("pass exactly one of --export or --standin")
+
+    job = PodSnapshotJob(args.state)
+    if args.full:
+        job.state = {'subscriptions': {}}
+    started = time.perf_counter()
+    if args.export:
+        affected, total = run_on_export(job, args.export, args.output)
+    else:
+        host, _, port = args.standin.rpartition(':')
+        affected, total = asyncio.run(run_on_standin(job, host or '127.0.0.1', int(port)))
+    job.save()
+    print(f"Rebuilt {len(affected)} of {total} miner snapshots in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
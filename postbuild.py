@@ -0,0 +1,212 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import write_atomic
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "asset-manifest.json"
+# Kept outside dist/, which vite build empties on every run
+STATE_PATH = ".postbuild_state.json"
+CACHE_DIR = ".postbuild_cache"
+# Written by vite build with build.manifest set; lists every file it named with a content hash
+VITE_DIR = ".vite"
+VITE_MANIFEST = f"{VITE_DIR}/manifest.json"
+# Without that manifest: Vite names bundled assets assets/[name]-[hash].[ext], the hash being
+# 8 base64url characters. An ordinary name can still look like that (foo-bar-settings.js),
+# so one without a digit or capital in its last 8 characters is not taken for hashed
+HASHED_ASSET = re.compile(r"^assets/[^/]+-(?=[a-z_-]*[A-Z0-9])[A-Za-z0-9_-]{8}\.\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = {'.html', '.js', '.mjs', '.css', '.json', '.map', '.svg', '.txt', '.xml', '.wasm'}
+# Below this, gzip headers eat most of the saving
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 9
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def list_assets(root):
+    """Relative paths of every build output, leaving out our own artifacts and Vite's"""
+    assets = []
+    for directory, subdirectories, names in os.walk(root):
+        if directory == root and VITE_DIR in subdirectories:
+            # Build metadata, not something the site serves
+            subdirectories.remove(VITE_DIR)
+        for name in names:
+            rel = os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/')
+            if rel != MANIFEST_NAME and not rel.endswith('.gz'):
+                assets.append(rel)
+    return sorted(assets)
+
+def hashed_assets(root):
+    """Files the Vite manifest lists as emitted under a content hash, or None without one"""
+    try:
+        with open(os.path.join(root, VITE_MANIFEST), encoding='utf-8') as file:
+            chunks = json.load(file)
+    except (OSError, ValueError):
+        return None
+    hashed = set()
+    for chunk in chunks.values():
+        hashed.add(chunk['file'])
+        hashed.update(chunk.get('css', ()))
+        hashed.update(chunk.get('assets', ()))
+    return hashed
+
+def cache_control(rel, hashed=None):
+    """Hashed assets never change under their name; everything else is revalidated"""
+    if hashed is not None:
+        return IMMUTABLE if rel in hashed else REVALIDATE
+    return IMMUTABLE if HASHED_ASSET.match(rel) else REVALIDATE
+
+def cache_name(digest, level):
+    return f"{digest}-{level}.gz"
+
+def gzip_bytes(data, level=GZIP_LEVEL):
+    # mtime=0 keeps the output, and so its ETag, identical across builds
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def process_asset(root, rel, previous, cache_dir, level=GZIP_LEVEL, hashed=None):
+    """Hash one asset and put its .gz variant beside it; runs in a worker process.
+
+    Returns the manifest entry and what was done: 'unchanged' when the asset
+    and its variant are as the last run left them, 'cached' when the variant
+    was copied from the compression cache, 'compressed' otherwise.
+    """
+    path = os.path.join(root, rel)
+    with open(path, 'rb') as file:
+        data = file.read()
+    digest = file_hash(data)
+    entry = {
+        'hash': digest, 'size': len(data),
+        'content_type': mimetypes.guess_type(rel)[0] or 'application/octet-stream',
+        'cache_control': cache_control(rel, hashed), 'etag': f'"{digest[:16]}"',
+    }
+    if os.path.splitext(rel)[1].lower() not in COMPRESSIBLE or len(data) < MIN_COMPRESS_SIZE:
+        return rel, entry, 'skipped'
+
+    gz_path = path + '.gz'
+    if (previous and previous['hash'] == digest and previous.get('gzip_size')
+            and os.path.exists(gz_path) and os.path.getsize(gz_path) == previous['gzip_size']):
+        entry['gzip_size'] = previous['gzip_size']
+        return rel, entry, 'unchanged'
+    # Compressed variants are cached by content hash, so a rebuilt dist/ only
+    # pays for the files that actually changed
+    cached = os.path.join(cache_dir, cache_name(digest, level))
+    action = 'cached'
+    try:
+        with open(cached, 'rb') as file:
+            compressed = file.read()
+    except FileNotFoundError:
+        compressed = gzip_bytes(data, level)
+        write_atomic(cached, compressed)
+        action = 'compressed'
+    if len(compressed) >= len(data):
+        # Not worth serving; make sure no stale variant is left behind
+        if os.path.exists(gz_path):
+            os.unlink(gz_path)
+        return rel, entry, action
+    write_atomic(gz_path, compressed)
+    entry['gzip_size'] = len(compressed)
+    return rel, entry, action
+
+def load_state(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def remove_orphans(root, state, entries):
+    """Delete .gz variants a previous run wrote that this run no longer has.
+
+    Only variants recorded in the state are considered, so .gz files that
+    came with the build itself (from public/, say) are left alone.
+    """
+    removed = 0
+    for rel, previous in state.items():
+        if previous.get('gzip_size') and not entries.get(rel, {}).get('gzip_size'):
+            try:
+                os.unlink(os.path.join(root, rel + '.gz'))
+            except FileNotFoundError:
+                # vite build already emptied dist/
+                continue
+            removed += 1
+    return removed
+
+def prune_cache(cache_dir, keep):
+    """Delete cached variants whose names are not in keep, so the cache tracks dist/"""
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith('.gz') and name not in keep:
+            os.unlink(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+def postbuild(root=DIST_DIR, processes=None, level=GZIP_LEVEL, state_path=STATE_PATH,
+              cache_dir=CACHE_DIR):
+    """Hash and precompress a vite build output, then write its manifest"""
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"no build output at {root!r}; run npm run build first")
+    os.makedirs(cache_dir, exist_ok=True)
+    state = load_state(state_path)
+    assets = list_assets(root)
+    hashed = hashed_assets(root)
+    entries, counts, cached = {}, {}, set()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(process_asset, root, rel, state.get(rel), cache_dir, level, hashed)
+                   for rel in assets]
+        for future in futures:
+            rel, entry, action = future.result()
+            entries[rel] = entry
+            counts[action] = counts.get(action, 0) + 1
+            if action != 'skipped':
+                cached.add(cache_name(entry['hash'], level))
+    counts['changed'] = sum(state.get(rel, {}).get('hash') != entry['hash']
+                            for rel, entry in entries.items())
+    counts['orphans_removed'] = remove_orphans(root, state, entries)
+    counts['cache_pruned'] = prune_cache(cache_dir, cached)
+
+    manifest = {'generated_at': int(time.time()), 'files': entries}
+    write_atomic(os.path.join(root, MANIFEST_NAME),
+                 json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    write_atomic(state_path, json.dumps(entries, sort_keys=True).encode('utf-8'))
+    return entries, counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Hash, precompress and write a cache-header manifest for the vite build output")
+    parser.add_argument('--dist', default=DIST_DIR, help=f"build output directory (default: {DIST_DIR})")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="compression worker processes (default: one per CPU)")
+    parser.add_argument('--level', type=int, default=GZIP_LEVEL, choices=range(1, 10), metavar='1-9',
+                        help=f"gzip level (default: {GZIP_LEVEL})")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        entries, counts = postbuild(args.dist, args.processes, args.level)
+    except FileNotFoundError as error:
+        parser.error(str(error))
+    total = sum(entry['size'] for entry in entries.values())
+    # What a gzip-capable client transfers, falling back to the original size
+    transfer = sum(entry.get('gzip_size', entry['size']) for entry in entries.values())
+    immutable = sum(entry['cache_control'] == IMMUTABLE for entry in entries.values())
+    print(f"Processed {len(entries)} files in {time.perf_counter() - started:.2f}s: "
+          f"{counts.get('compressed', 0)} compressed, {counts.get('cached', 0)} from cache, "
+          f"{counts.get('unchanged', 0)} unchanged, {counts.get('skipped', 0)} not compressible")
+    print(f"{counts['changed']} changed since the last run, {immutable} immutable, "
+          f"{counts['orphans_removed']} stale .gz removed, {counts['cache_pruned']} pruned from the cache")
+    if total:
+        print(f"Transfer size {transfer} of {total} bytes ({100 * (1 - transfer / total):.1f}% saved); "
+              f"manifest at {os.path.join(args.dist, MANIFEST_NAME)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import html
+import json
+import math
+import os
+import time
+
+import update_structure
+from common import miner_hardware, to_ms
+
+# Mirrors getUsageColor / getUsageBgColor / getStatusColor in src/utils/utils.js
+USAGE_HIGH = 80
+USAGE_MEDIUM = 60
+STATUS_COLORS = {'Running': 'bg-green-500', 'Failed': 'bg-red-500',
+                 'Deploying': 'bg-blue-500', 'Terminated': 'bg-gray-500'}
+DEFAULT_STATUS_COLOR = 'bg-gray-400'
+# mapFirestoreStatus in Dashboard.jsx
+FIRESTORE_STATUSES = {'online': 'Running', 'pending_verification': 'Deploying',
+                      'terminated': 'Terminated', 'failed': 'Failed'}
+ROOT_MARKER = '<div id="root"></div>'
+# Rows are joined into chunks of this many before each write
+CHUNK_ROWS = 512
+
+
+def usage_color(percentage):
+    if percentage >= USAGE_HIGH:
+        return 'text-red-500'
+    if percentage >= USAGE_MEDIUM:
+        return 'text-yellow-500'
+    return 'text-green-500'
+
+def usage_bg_color(percentage):
+    if percentage >= USAGE_HIGH:
+        return 'bg-red-500'
+    if percentage >= USAGE_MEDIUM:
+        return 'bg-yellow-500'
+    return 'bg-green-500'
+
+def status_color(status):
+    return STATUS_COLORS.get(status, DEFAULT_STATUS_COLOR)
+
+def js_text(value):
+    """Render a value the way JSX text interpolation shows it (78.0 -> 78)"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return html.escape(str(value))
+
+
+# Cluster sources: each is a callable returning a fresh iterator of records in the
+# initialClusters schema, so the stats pass and the row pass can both stream
+
+def json_source(path):
+    """A JSON file holding initialClusters (like templates/seed/clusters.json) or a bare list"""
+    def records():
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        return iter(data['initialClusters'] if isinstance(data, dict) else data)
+    return records
+
+def jsonl_source(path):
+    """One cluster per line; read lazily, so memory stays flat for any size"""
+    def records():
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    return records
+
+def generated_source(count, seed=0):
+    """The same synthetic fleet update_structure.py --generate-clusters writes"""
+    return lambda: update_structure.generate_clusters(count, seed)
+
+def time_remaining(created_at, now_ms):
+    """calculateTimeRemaining in Dashboard.jsx, where a missing created_at defaults to now"""
+    created_ms = to_ms(created_at)
+    if created_ms is None:
+        return '0h'
+    # Math.round, which rounds halves up rather than to even
+    return f"{math.floor((now_ms - created_ms) / 3_600_000 + 0.5)}h"
+
+def miner_gpu(resource):
+    """(gpu, clusterType) as fetchComputeResource in Dashboard.jsx sets them"""
+    if not resource:
+        return {'type': 'CPU', 'count': 0, 'name': 'Unknown'}, ''
+    device, cluster_type = miner_hardware(resource)
+    cpu_specs = resource.get('cpu_specs') or {}
+    return {'type': resource.get('resource_type') or 'CPU', 'name': device,
+            'count': cpu_specs.get('cores_per_socket') or 1}, cluster_type
+
+def export_source(path):
+    """Clusters joined from miners, miner_states and compute_resources the way Dashboard.jsx builds them"""
+    def records():
+        with open(path, encoding='utf-8') as file:
+            export = json.load(file)
+        now_ms = int(time.time() * 1000)
+        states = {}
+        for state in export.get('miner_states', {}).values():
+            states[state.get('miner_id')] = state
+        resources = export.get('compute_resources', {})
+        for doc_id, data in export.get('miners', {}).items():
+            status = data.get('status') or ''
+            # Dashboard.jsx skips miners with a "running" status
+            if status.lower() == 'running':
+                continue
+            # The first resource, in collection order, that the miner lists
+            listed = set(data.get('compute_resources') or [])
+            resource = next((resource for resource_id, resource in resources.items()
+                             if resource_id in listed), None)
+            gpu, cluster_type = miner_gpu(resource)
+            cluster = {'name': data.get('name') or 'Unnamed Miner',
+                       'status': FIRESTORE_STATUSES.get(status, status),
+                       'timeRemaining': time_remaining(data.get('created_at'), now_ms),
+                       'gpu': gpu, 'clusterType': cluster_type,
+                       'cpuUsage': 0, 'memoryUsage': 0}
+            state = states.get(doc_id)
+            if state:
+                metrics = (state.get('current_metrics') or {}).get('metrics') or {}
+                current = state.get('current_status')
+                if current == 'online':
+                    cluster['status'] = 'Running'
+                elif current == 'offline':
+                    cluster['status'] = 'Failed'
+                cluster['cpuUsage'] = metrics.get('cpu_usage') or 0
+                cluster['memoryUsage'] = metrics.get('memory_usage') or 0
+                cluster['incident'] = any((metrics.get(name) or 0) > 90
+                                          for name in ('cpu_usage', 'memory_usage', 'disk_usage'))
+            yield cluster
+    return records
+
+
+def cluster_stats(records):
+    """The four counters App.jsx shows above the table, in one pass"""
+    stats = {'Running Clusters': 0, 'Deploying Clusters': 0, 'Failed Clusters': 0,
+             'Active Incidents': 0}
+    keys = {'Running': 'Running Clusters', 'Deploying': 'Deploying Clusters',
+            'Failed': 'Failed Clusters'}
+    total = 0
+    for cluster in records:
+        total += 1
+        key = keys.get(cluster.get('status'))
+        if key:
+            stats[key] += 1
+        if cluster.get('incident'):
+            stats['Active Incidents'] += 1
+    return stats, total
+
+def render_stats(stats):
+    cards = ''.join(
+        '<div class="p-4 rounded-lg border bg-white border-gray-200">'
+        '<div class="flex items-center justify-between mb-2">'
+        f'<h3 class="text-sm text-gray-500">{title}</h3></div>'
+        f'<p class="text-2xl font-semibold">{value}</p></div>'
+        for title, value in stats.items())
+    return f'<div class="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 mb-8">{cards}</div>'
+
+def render_usage(label, value, spacing=''):
+    return (f'<div class="flex items-center justify-between{spacing}">'
+            f'<span class="text-xs">{label}</span>'
+            f'<span class="text-xs {usage_color(value)}">{js_text(value)}%</span></div>'
+            '<div class="w-full bg-gray-200 rounded-full h-1.5 dark:bg-gray-700">'
+            f'<div class="h-1.5 rounded-full {usage_bg_color(value)}" style="width: {js_text(value)}%"></div>'
+            '</div>')
+
+def render_row(cluster):
+    """One ClusterTable row as it first renders (light mode, dropdown closed)"""
+    status = cluster.get('status', '')
+    gpu = cluster.get('gpu') or {}
+    incident = ('<span class="text-xs bg-red-50 text-red-500 px-2 py-1 rounded flex items-center gap-1">'
+                '<span>!</span>Ongoing Incident</span>' if cluster.get('incident') else '')
+    cluster_type = (f'<span class="text-xs px-2 py-1 rounded bg-gray-100">{js_text(cluster["clusterType"])}</span>'
+                    if cluster.get('clusterType') else '')
+    if status not in ('Failed', 'Terminated'):
+        cpu, memory = cluster.get('cpuUsage', 0), cluster.get('memoryUsage', 0)
+        usage = ('<div class="flex flex-col gap-1">' + render_usage('CPU', cpu)
+                 + render_usage('Memory', memory, ' mt-1') + '</div>')
+    else:
+        usage = '<span class="text-xs text-gray-500">No data available</span>'
+    return ('<tr class="border-gray-200 border-t">'
+            '<td class="p-4"><div class="flex items-center gap-2">'
+            f'<span class="w-2 h-2 rounded-full {status_color(status)}"></span>'
+            f'<span class="text-sm">{js_text(status)}</span></div></td>'
+            '<td class="p-4"><div class="flex items-center gap-2">'
+            f'<span class="text-sm">{js_text(cluster.get("name", ""))}</span>{incident}</div></td>'
+            f'<td class="p-4">{js_text(cluster.get("timeRemaining", ""))}</td>'
+            '<td class="p-4"><div class="flex items-center gap-2">'
+            f'<span class="text-sm">{js_text(gpu.get("type", ""))}</span>'
+            f'<span class="text-xs text-gray-500">{js_text(gpu.get("count", ""))}</span>{cluster_type}</div></td>'
+            f'<td class="p-4">{usage}</td><td class="p-4"></td></tr>\n')
+
+TABLE_HEAD = ('<div class="p-4 rounded-lg bg-white shadow-sm"><div class="mt-6 overflow-x-auto">'
+              '<table class="w-full min-w-[500px] border rounded-lg border-gray-200">'
+              '<thead class="bg-gray-50 text-gray-700 text-sm"><tr>'
+              + ''.join(f'<th class="text-left p-4">{heading}</th>' for heading in
+                        ('Status', 'Cluster Name', 'Compute Hrs Remaining', 'CPUs/GPUs', 'Usage', ''))
+              + '</tr></thead><tbody>\n')
+TABLE_TAIL = '</tbody></table></div></div>'
+
+def prerender(records, file):
+    """Stream the stats cards and table for records() into an open text file.
+
+    records is called twice: once to count statuses for the cards that sit
+    above the table, then again to write the rows chunk by chunk.
+    """
+    stats, total = cluster_stats(records())
+    file.write('<main class="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">')
+    file.write(render_stats(stats))
+    file.write(TABLE_HEAD)
+    chunk = []
+    for cluster in records():
+        chunk.append(render_row(cluster))
+        if len(chunk) >= CHUNK_ROWS:
+            file.write(''.join(chunk))
+            chunk.clear()
+    file.write(''.join(chunk))
+    file.write(TABLE_TAIL + '</main>')
+    return total
+
+def write_page(records, shell, output):
+    """Write shell with the prerendered markup inside its root div, atomically"""
+    with open(shell, encoding='utf-8') as file:
+        page = file.read()
+    if ROOT_MARKER not in page:
+        raise ValueError(f"{shell} has no {ROOT_MARKER}")
+    head, tail = page.split(ROOT_MARKER, 1)
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as file:
+            # React's createRoot replaces this markup on mount
+            file.write(head + '<div id="root">')
+            total = prerender(records, file)
+            file.write('</div>' + tail)
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Prerender the cluster stats and table into static HTML for first paint")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--clusters', metavar='FILE',
+                        help="JSON with initialClusters, or a bare list (default: the seed data)")
+    source.add_argument('--jsonl', metavar='FILE', help="one cluster per line, streamed")
+    source.add_argument('--export', metavar='FILE',
+                        help="stand-in export with miners, miner_states and compute_resources collections")
+    source.add_argument('--generate', type=int, metavar='N',
+                        help="N synthetic clusters, as update_structure.py --generate-clusters")
+    parser.add_argument('--seed', type=int, default=0, help="seed for --generate (default: 0)")
+    parser.add_argument('--shell', default='index.html', help="page to inject into (default: index.html)")
+    parser.add_argument('--output', default='prerendered.html',
+                        help="where to write the page (default: prerendered.html)")
+    args = parser.parse_args(argv)
+
+    if args.jsonl:
+        records = jsonl_source(args.jsonl)
+    elif args.export:
+        records = export_source(args.export)
+    elif args.generate:
+        records = generated_source(args.generate, args.seed)
+    else:
+        records = json_source(args.clusters or update_structure.SEED_DATA)
+    started = time.perf_counter()
+    try:
+        total = write_page(records, args.shell, args.output)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    print(f"Prerendered {total} clusters into {args.output} in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from common import UNKNOWN, miner_hardware, subscription_miner, to_ms, write_atomic
+
+ROLLUP_COLLECTION = 'dashboard_rollups'
+ROLLUP_DOC = 'totals'
+MINER_ROLLUP_COLLECTION = 'miner_rollups'
+DIMENSIONS = ('gpu_type', 'cluster_type')
+HOUR_MS = 3_600_000
+
+
+class Totals:
+    """Running totals from which compute hours can be read at any instant.
+
+    Hours at time t are closed_ms + active * t - active_created_ms, so
+    terminated subscriptions contribute a fixed span and live ones keep
+    growing without anything having to be recomputed. Like the dashboard's
+    max(0, ...), a subscription created in the future counts zero hours:
+    those few are kept apart in future until the clock passes them.
+    """
+
+    __slots__ = ('subscriptions', 'active', 'active_created_ms', 'closed_ms', 'now_ms', 'future')
+
+    def __init__(self):
+        self.subscriptions = 0
+        self.active = 0
+        self.active_created_ms = 0
+        self.closed_ms = 0
+        # Latest time hours were read at, and created_ms -> count of live ones after it
+        self.now_ms = int(time.time() * 1000)
+        self.future = {}
+
+    def add(self, contribution, sign=1):
+        counted, created, ended = contribution
+        self.subscriptions += sign * counted
+        if created is None:
+            return
+        if ended is None:
+            self.active += sign
+            self.active_created_ms += sign * created
+            if created in self.future or created > self.now_ms:
+                count = self.future.get(created, 0) + sign
+                if count:
+                    self.future[created] = count
+                else:
+                    del self.future[created]
+        else:
+            self.closed_ms += sign * max(0, ended - created)
+
+    def empty(self):
+        return not (self.subscriptions or self.active or self.closed_ms)
+
+    def compute_hours(self, now_ms):
+        if now_ms > self.now_ms:
+            self.now_ms = now_ms
+            for created in [created for created in self.future if created <= now_ms]:
+                del self.future[created]
+        # Add back what the running totals subtract for subscriptions that have not started yet
+        not_started = sum((created - now_ms) * count for created, count in self.future.items()
+                          if created > now_ms)
+        return (self.closed_ms + self.active * now_ms - self.active_created_ms + not_started) / HOUR_MS
+
+    def document(self, now_ms):
+        return {'subscriptions': self.subscriptions, 'active': self.active,
+                'active_created_ms': self.active_created_ms, 'closed_ms': self.closed_ms,
+                'compute_hours': round(self.compute_hours(now_ms), 2)}
+
+
+class Rollups:
+    """Fleet, per-miner, per-GPU-type and per-cluster-type totals kept up to date
+    one subscription change at a time"""
+
+    def __init__(self):
+        self.fleet = Totals()
+        self.groups = {'miner': {}, **{dimension: {} for dimension in DIMENSIONS}}
+        # subscription id -> (group keys, contribution) currently counted for it
+        self.subscriptions = {}
+        self.miner_subscriptions = {}
+        self.hardware = {}
+        self.changed_miners = set()
+        self.dirty = False
+
+    def contribute(self, keys, contribution, sign):
+        self.fleet.add(contribution, sign)
+        for dimension, key in zip(self.groups, keys):
+            group = self.groups[dimension]
+            totals = group.get(key)
+            if totals is None:
+                totals = group[key] = Totals()
+            totals.add(contribution, sign)
+            if totals.empty():
+                del group[key]
+        self.changed_miners.add(keys[0])
+        self.dirty = True
+
+    def remove(self, sub_id):
+        previous = self.subscriptions.pop(sub_id, None)
+        if previous is not None:
+            self.contribute(*previous, -1)
+            self.miner_subscriptions[previous[0][0]].discard(sub_id)
+        return previous
+
+    def upsert(self, sub_id, data):
+        """Count a subscription document, replacing whatever it contributed before"""
+        self.remove(sub_id)
+        info = data.get('container_info') or {}
+        miner_id = subscription_miner(data) or UNKNOWN
+        keys = (miner_id, *self.hardware.get(miner_id, (UNKNOWN, UNKNOWN)))
+        # Same rules as fetchTotalSubscriptions / calculateTotalComputeHours
+        contribution = (int(data.get('status') != 'running'),
+                        to_ms(data.get('created_at') or info.get('created_at')),
+                        to_ms(data.get('terminated_at')))
+        self.subscriptions[sub_id] = (keys, contribution)
+        self.miner_subscriptions.setdefault(miner_id, set()).add(sub_id)
+        self.contribute(keys, contribution, 1)
+
+    def terminate(self, sub_id, terminated_at):
+        current = self.subscriptions.get(sub_id)
+        if current is None or current[1][2] is not None:
+            return
+        keys, (counted, created, _) = current
+        self.remove(sub_id)
+        contribution = (counted, created, terminated_at)
+        self.subscriptions[sub_id] = (keys, contribution)
+        self.miner_subscriptions[keys[0]].add(sub_id)
+        self.contribute(keys, contribution, 1)
+
+    def set_hardware(self, miner_id, hardware):
+        """Move a miner's subscriptions to the GPU and cluster type of its new resource"""
+        if self.hardware.get(miner_id) == hardware:
+            return
+        self.hardware[miner_id] = hardware
+        for sub_id in list(self.miner_subscriptions.get(miner_id, ())):
+            keys, contribution = self.remove(sub_id)
+            keys = (miner_id, *hardware)
+            self.subscriptions[sub_id] = (keys, contribution)
+            self.miner_subscriptions[miner_id].add(sub_id)
+            self.contribute(keys, contribution, 1)
+
+    def apply(self, event, now_ms=None):
+        """Apply one {"event": created|updated|terminated|deleted, "id": ...} change"""
+        kind, sub_id = event['event'], event['id']
+        if kind in ('created', 'updated'):
+            self.upsert(sub_id, event['data'])
+        elif kind == 'terminated':
+            ended = to_ms(event.get('terminated_at'))
+            self.terminate(sub_id, ended if ended is not None else now_ms or int(time.time() * 1000))
+        elif kind == 'deleted':
+            self.remove(sub_id)
+        else:
+            raise ValueError(f"unknown event {kind!r}")
+
+    def summary(self, now_ms):
+        """The single document the dashboard reads for its totals"""
+        return {
+            'as_of_ms': now_ms,
+            'fleet': self.fleet.document(now_ms),
+            **{f"by_{dimension}": {key: totals.document(now_ms)
+                                   for key, totals in sorted(self.groups[dimension].items())}
+               for dimension in DIMENSIONS},
+        }
+
+    def take_miner_documents(self, now_ms):
+        """Per-miner documents changed since the last call; None marks a deletion"""
+        miners = self.groups['miner']
+        documents = {miner_id: miners[miner_id].document(now_ms) if miner_id in miners else None
+                     for miner_id in self.changed_miners}
+        self.changed_miners.clear()
+        self.dirty = False
+        return documents
+
+
+def load_export(rollups, export):
+    for resource in export.get('compute_resources', {}).values():
+        if resource.get('miner_id'):
+            rollups.set_hardware(resource['miner_id'], miner_hardware(resource))
+    for sub_id, data in export.get('container_subscriptions', {}).items():
+        rollups.upsert(sub_id, data)
+
+def write_output(rollups, path, now_ms):
+    """Publish to a local {collection: {doc_id: data}} file, merging miner documents"""
+    try:
+        with open(path, encoding='utf-8') as file:
+            published = json.load(file)
+    except (OSError, ValueError):
+        published = {}
+    miners = published.setdefault(MINER_ROLLUP_COLLECTION, {})
+    for miner_id, document in rollups.take_miner_documents(now_ms).items():
+        if document is None:
+            miners.pop(miner_id, None)
+        else:
+            miners[miner_id] = document
+    published[ROLLUP_COLLECTION] = {ROLLUP_DOC: rollups.summary(now_ms)}
+    write_atomic(path, json.dumps(published, separators=(',', ':')).encode('utf-8'))
+
+async def publish_standin(rollups, client, now_ms):
+    writes = [{'collection': ROLLUP_COLLECTION, 'doc': ROLLUP_DOC, 'data': rollups.summary(now_ms)}]
+    for miner_id, document in rollups.take_miner_documents(now_ms).items():
+        if document is None:
+            writes.append({'collection': MINER_ROLLUP_COLLECTION, 'doc': miner_id, 'delete': True})
+        else:
+            writes.append({'collection': MINER_ROLLUP_COLLECTION, 'doc': miner_id, 'data': document})
+    await client.batch(writes)
+
+def now_ms():
+    return int(time.time() * 1000)
+
+def changed_docs(message):
+    """(doc_id, data) per docChange in a listener snapshot, data None once removed"""
+    return [(change['id'], None if change['type'] == 'removed' else change['data'])
+            for change in message['changes']]
+
+async def follow_standin(rollups, host, port, interval, duration=None):
+    """Keep the rollups current from stand-in listeners, publishing when anything changed"""
+    from firestore_standin import Client
+
+    client = await Client(host, port).connect()
+
+    def on_resources(message):
+        for _, data in changed_docs(message):
+            if data and data.get('miner_id'):
+                rollups.set_hardware(data['miner_id'], miner_hardware(data))
+
+    def on_subscriptions(message):
+        for sub_id, data in changed_docs(message):
+            if data is None:
+                rollups.remove(sub_id)
+            else:
+                rollups.upsert(sub_id, data)
+
+    try:
+        await client.listen('compute_resources', [], on_resources)
+        await client.listen('container_subscriptions', [], on_subscriptions)
+        deadline = time.monotonic() + duration if duration else None
+        while deadline is None or time.monotonic() < deadline:
+            if rollups.dirty:
+                await publish_standin(rollups, client, now_ms())
+            await asyncio.sleep(interval)
+        if rollups.dirty:
+            await publish_standin(rollups, client, now_ms())
+    finally:
+        await client.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Maintain compute-hour and subscription rollups from subscription changes")
+    parser.add_argument('--export', metavar='FILE',
+                        help="initial {collection: {doc_id: data}} export to start from")
+    parser.add_argument('--events', metavar='FILE',
+                        help="JSONL change stream of created/updated/terminated/deleted events, '-' for stdin")
+    parser.add_argument('--output', default='rollups.json',
+                        help="published rollups when not using --standin (default: rollups.json)")
+    parser.add_argument('--standin', metavar='HOST:PORT',
+                        help="follow and publish to a running firestore_standin.py instead")
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help="how often --standin mode publishes changes (default: 1)")
+    parser.add_argument('--duration', type=float, metavar='SECONDS',
+                        help="stop following the stand-in after this long")
+    args = parser.parse_args(argv)
+    if not (args.export or args.events or args.standin):
+        parser.error("pass --export, --events and/or --standin")
+
+    rollups = Rollups()
+    started = time.perf_counter()
+    if args.export:
+        with open(args.export, encoding='utf-8') as file:
+            load_export(rollups, json.load(file))
+    applied = 0
+    if args.events:
+        source = sys.stdin if args.events == '-' else open(args.events, encoding='utf-8')
+        with source:
+            for line in source:
+                if line.strip():
+                    rollups.apply(json.loads(line))
+                    applied += 1
+    if args.standin:
+        host, _, port = args.standin.rpartition(':')
+        try:
+            asyncio.run(follow_standin(rollups, host or '127.0.0.1', int(port), args.interval, args.duration))
+        except KeyboardInterrupt:
+            pass
+    else:
+        write_output(rollups, args.output, now_ms())
+    fleet = rollups.fleet
+    print(f"Applied {applied} events over {len(rollups.subscriptions)} subscriptions in "
+          f"{time.perf_counter() - started:.2f}s: {fleet.subscriptions} subscriptions, "
+          f"{round(fleet.compute_hours(now_ms()))} compute hours")
+
+if __name__ == "__main__":
+    main()
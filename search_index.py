@@ -0,0 +1,232 @@
+import argparse
+import base64
+from array import array
+import json
+import random
+import sys
+import time
+
+# The StatusFilter.jsx choices other than 'Show All'
+STATUSES = ('Running', 'Failed', 'Deploying', 'Terminated')
+SHOW_ALL = 'Show All'
+
+
+def normalize(name):
+    # Same as the app's name.toLowerCase(), so index hits match includes()
+    return name.lower()
+
+def trigrams_of(text):
+    # By code point; the JS query splits the needle with Array.from to match
+    return {text[start:start + 3] for start in range(len(text) - 2)}
+
+def append_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def encode_postings(postings):
+    """Delta + varint encode ascending positions, base64 for embedding in JS"""
+    out = bytearray()
+    previous = 0
+    for position in postings:
+        append_varint(out, position - previous)
+        previous = position
+    return base64.b64encode(bytes(out)).decode('ascii')
+
+def decode_postings(text):
+    postings, value, shift, previous = [], 0, 0, 0
+    for byte in base64.b64decode(text):
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        postings.append(previous)
+        value = shift = 0
+    return postings
+
+def encode_bitset(positions, count):
+    """Bit i (LSB first within each byte) is set for every position i"""
+    bits = bytearray((count + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+class SearchIndex:
+    """Normalized names, trigram postings and status bitsets for a cluster list.
+
+    Names are kept as one UTF-8 buffer with end offsets, postings already
+    delta + varint encoded and status positions as array('I'), so a few
+    hundred thousand clusters cost megabytes rather than a Python object
+    per name and per posting.
+    """
+
+    def __init__(self):
+        self.name_bytes = bytearray()
+        self.name_ends = array('I')
+        # trigram -> encoded postings, and the last position appended to each
+        self.postings = {}
+        self.last_position = {}
+        self.by_status = {status: array('I') for status in STATUSES}
+
+    def __len__(self):
+        return len(self.name_ends)
+
+    def add(self, cluster):
+        position = len(self.name_ends)
+        name = normalize(cluster.get('name', ''))
+        self.name_bytes += name.encode('utf-8')
+        self.name_ends.append(len(self.name_bytes))
+        for gram in trigrams_of(name):
+            postings = self.postings.get(gram)
+            if postings is None:
+                postings = self.postings[gram] = bytearray()
+            append_varint(postings, position - self.last_position.get(gram, 0))
+            self.last_position[gram] = position
+        positions = self.by_status.get(cluster.get('status'))
+        if positions is not None:
+            positions.append(position)
+
+    def extend(self, clusters):
+        for cluster in clusters:
+            self.add(cluster)
+        return self
+
+    def iter_names(self):
+        start = 0
+        for end in self.name_ends:
+            yield self.name_bytes[start:end].decode('utf-8')
+            start = end
+
+    def iter_trigrams(self):
+        """(trigram, encoded postings) pairs in trigram order, encoded one at a time"""
+        for gram in sorted(self.postings):
+            yield gram, base64.b64encode(self.postings[gram]).decode('ascii')
+
+    def status_bits(self):
+        return {status: encode_bitset(positions, len(self))
+                for status, positions in self.by_status.items()}
+
+    def module_params(self):
+        """Placeholder values for templates/src/data/searchIndex.js.tmpl"""
+        return {
+            'count': len(self),
+            'names': list(self.iter_names()),
+            'statusBits': self.status_bits(),
+            'trigrams': dict(self.iter_trigrams()),
+        }
+
+
+class IndexReader:
+    """Query an encoded index the way searchClusters() in the JS module does"""
+
+    def __init__(self, params):
+        self.names = params['names']
+        self.trigrams = params['trigrams']
+        self.status_bits = {status: base64.b64decode(bits)
+                            for status, bits in params['statusBits'].items()}
+        self.decoded = {}
+
+    def postings(self, gram):
+        if gram not in self.decoded:
+            self.decoded[gram] = decode_postings(self.trigrams[gram])
+        return self.decoded[gram]
+
+    def search(self, term, status=SHOW_ALL):
+        """Ascending positions whose name contains term and whose status matches"""
+        needle = normalize(term)
+        bits = None
+        if status != SHOW_ALL:
+            bits = self.status_bits.get(status)
+            if bits is None:
+                return []
+        candidates = None
+        if len(needle) >= 3:
+            grams = trigrams_of(needle)
+            if any(gram not in self.trigrams for gram in grams):
+                return []
+            # Intersect from the shortest postings list (shortest encoding) up
+            for gram in sorted(grams, key=lambda gram: len(self.trigrams[gram])):
+                postings = self.postings(gram)
+                candidates = postings if candidates is None else sorted(set(candidates) & set(postings))
+                if not candidates:
+                    return []
+        positions = candidates if candidates is not None else range(len(self.names))
+        # Trigram hits can still be false positives, so confirm the substring
+        return [position for position in positions
+                if (bits is None or bits[position >> 3] >> (position & 7) & 1)
+                and needle in self.names[position]]
+
+
+def linear_search(clusters, term, status=SHOW_ALL):
+    """What App.jsx computes on every keystroke"""
+    needle = term.lower()
+    return [position for position, cluster in enumerate(clusters)
+            if needle in cluster['name'].lower() and (status == SHOW_ALL or cluster['status'] == status)]
+
+def sample_queries(clusters, count, seed=0):
+    """Substrings of real names (hits) plus a few random strings (mostly misses)"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(clusters)['name']
+        if rng.random() < 0.2:
+            term = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789 ') for _ in range(rng.randint(1, 6)))
+        else:
+            start = rng.randrange(len(name))
+            term = name[start:start + rng.randint(1, 8)]
+        queries.append((term, rng.choice((SHOW_ALL,) + STATUSES)))
+    return queries
+
+def benchmark(clusters, queries):
+    started = time.perf_counter()
+    params = SearchIndex().extend(clusters).module_params()
+    built = time.perf_counter()
+    reader = IndexReader(json.loads(json.dumps(params)))
+
+    mismatches = 0
+    indexed_s = linear_s = 0.0
+    for term, status in queries:
+        started_query = time.perf_counter()
+        found = reader.search(term, status)
+        indexed_s += time.perf_counter() - started_query
+        started_query = time.perf_counter()
+        expected = linear_search(clusters, term, status)
+        linear_s += time.perf_counter() - started_query
+        mismatches += found != expected
+    return {
+        'clusters': len(clusters), 'queries': len(queries), 'mismatches': mismatches,
+        'build_s': round(built - started, 3),
+        'index_bytes': len(json.dumps(params, separators=(',', ':'))),
+        'trigrams': len(params['trigrams']),
+        'indexed_ms_per_query': round(indexed_s / len(queries) * 1000, 3),
+        'linear_ms_per_query': round(linear_s / len(queries) * 1000, 3),
+    }
+
+def main(argv=None):
+    import update_structure
+
+    parser = argparse.ArgumentParser(
+        description="Validate the generated cluster search index against a linear scan and time both")
+    parser.add_argument('--clusters', metavar='FILE',
+                        help="JSON with initialClusters, or a bare list (default: generate)")
+    parser.add_argument('--generate', type=int, default=50_000, metavar='N',
+                        help="synthetic clusters to index when --clusters is not given (default: 50000)")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.clusters:
+        with open(args.clusters, encoding='utf-8') as file:
+            data = json.load(file)
+        clusters = data['initialClusters'] if isinstance(data, dict) else data
+    else:
+        clusters = list(update_structure.generate_clusters(args.generate, args.seed))
+    report = benchmark(clusters, sample_queries(clusters, args.queries, args.seed))
+    print(json.dumps(report, indent=2))
+    return 1 if report['mismatches'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
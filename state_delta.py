@@ -0,0 +1,218 @@
+import argparse
+import json
+import sys
+from decimal import Decimal
+
+# Wire code -> path of each tracked miner_states field
+FIELDS = {
+    's': ('current_status',),
+    'c': ('current_metrics', 'metrics', 'cpu_usage'),
+    'm': ('current_metrics', 'metrics', 'memory_usage'),
+    'd': ('current_metrics', 'metrics', 'disk_usage'),
+    'o': ('current_metrics', 'system_info', 'os_version'),
+    'h': ('current_metrics', 'system_info', 'hostname'),
+}
+METRIC_CODES = ('c', 'm', 'd')
+DEFAULT_STEP = 0.5
+DEFAULT_KEYFRAME_EVERY = 60
+
+
+def get_path(doc, path):
+    for part in path:
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+def heartbeat_ms(doc):
+    heartbeat = doc.get('last_heartbeat') or {}
+    return heartbeat.get('seconds', 0) * 1000 + heartbeat.get('nanoseconds', 0) // 1_000_000
+
+def compact(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+class Quantizer:
+    """Metrics travel as integer multiples of step, which keeps a steady metric
+    from producing a change on every heartbeat"""
+
+    def __init__(self, step=DEFAULT_STEP):
+        self.step = step
+        self.places = max(0, -Decimal(str(step)).as_tuple().exponent)
+
+    def quantize(self, value):
+        return None if value is None else round(value / self.step)
+
+    def restore(self, units):
+        return None if units is None else round(units * self.step, self.places)
+
+    def fields(self, doc):
+        """Every tracked field of doc in wire form, None when absent"""
+        values = {code: get_path(doc, path) for code, path in FIELDS.items()}
+        for code in METRIC_CODES:
+            values[code] = self.quantize(values[code])
+        return values
+
+
+class DeltaEncoder:
+    """Turn a stream of full miner_states documents into keyframes and deltas.
+
+    A miner's first frame and every keyframe_every-th one after it carry all
+    fields, its id and a dense index; the frames in between carry the index,
+    the heartbeat time relative to the previous one, and only the fields whose
+    (quantized) value changed. heartbeat_count is left out while it advances
+    by exactly one.
+    """
+
+    def __init__(self, step=DEFAULT_STEP, keyframe_every=DEFAULT_KEYFRAME_EVERY):
+        self.quantizer = Quantizer(step)
+        self.keyframe_every = keyframe_every
+        self.indexes = {}
+        self.state = {}
+        self.keyframes = 0
+
+    def encode(self, doc):
+        miner_id = doc['miner_id']
+        fields = self.quantizer.fields(doc)
+        ts = heartbeat_ms(doc)
+        count = doc.get('heartbeat_count', 0)
+        index = self.indexes.setdefault(miner_id, len(self.indexes))
+        previous = self.state.get(index)
+        if previous is None or previous['frames'] + 1 >= self.keyframe_every:
+            frame = {'k': 1, 'i': miner_id, 'x': index, 't': ts, 'n': count,
+                     **{code: value for code, value in fields.items() if value is not None}}
+            frames = 0
+            self.keyframes += 1
+        else:
+            frame = {'x': index, 't': ts - previous['ts']}
+            if count != previous['count'] + 1:
+                frame['n'] = count
+            for code, value in fields.items():
+                if value != previous['fields'][code]:
+                    frame[code] = value
+            frames = previous['frames'] + 1
+        self.state[index] = {'fields': fields, 'ts': ts, 'count': count, 'frames': frames}
+        return frame
+
+
+class DeltaDecoder:
+    """Rebuild full miner_states documents from encoded frames"""
+
+    def __init__(self, step=DEFAULT_STEP):
+        self.quantizer = Quantizer(step)
+        self.state = {}
+
+    def decode(self, frame):
+        """The miner's document after this frame, or None for a delta received
+        before that miner's first keyframe"""
+        index = frame['x']
+        if frame.get('k'):
+            state = self.state[index] = {
+                'miner_id': frame['i'], 'ts': frame['t'], 'count': frame['n'],
+                'fields': {code: frame.get(code) for code in FIELDS},
+            }
+        else:
+            state = self.state.get(index)
+            if state is None:
+                return None
+            state['ts'] += frame['t']
+            state['count'] = frame.get('n', state['count'] + 1)
+            for code in FIELDS:
+                if code in frame:
+                    state['fields'][code] = frame[code]
+        return self.document(state)
+
+    def document(self, state):
+        fields = state['fields']
+        doc = {'miner_id': state['miner_id']}
+        for code, path in FIELDS.items():
+            value = fields[code]
+            if value is None:
+                continue
+            if code in METRIC_CODES:
+                value = self.quantizer.restore(value)
+            target = doc
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = value
+        doc['heartbeat_count'] = state['count']
+        doc['last_heartbeat'] = {'seconds': state['ts'] // 1000,
+                                 'nanoseconds': state['ts'] % 1000 * 1_000_000}
+        return doc
+
+
+def comparable(doc, quantizer):
+    """doc reduced to what the codec promises to preserve"""
+    expected = DeltaDecoder(quantizer.step).document({
+        'miner_id': doc['miner_id'], 'ts': heartbeat_ms(doc), 'count': doc.get('heartbeat_count', 0),
+        'fields': quantizer.fields(doc)})
+    return compact(expected)
+
+def report(lines, step=DEFAULT_STEP, keyframe_every=DEFAULT_KEYFRAME_EVERY):
+    """Encode a trace, decode it again, and measure the payload bytes saved"""
+    encoder = DeltaEncoder(step, keyframe_every)
+    decoder = DeltaDecoder(step)
+    documents = full_bytes = delta_bytes = mismatches = changed_fields = 0
+    max_error = 0.0
+    for line in lines:
+        if not line.strip():
+            continue
+        doc = json.loads(line)
+        frame = encoder.encode(doc)
+        decoded = decoder.decode(frame)
+        documents += 1
+        full_bytes += len(compact(doc)) + 1
+        delta_bytes += len(compact(frame)) + 1
+        if not frame.get('k'):
+            changed_fields += sum(code in frame for code in FIELDS)
+        if compact(decoded) != comparable(doc, encoder.quantizer):
+            mismatches += 1
+        for code in METRIC_CODES:
+            original = get_path(doc, FIELDS[code])
+            if original is not None:
+                restored = get_path(decoded, FIELDS[code])
+                max_error = max(max_error, abs(restored - original))
+    deltas = documents - encoder.keyframes
+    return {
+        'documents': documents, 'miners': len(encoder.indexes),
+        'keyframes': encoder.keyframes, 'deltas': deltas,
+        'changed_fields_per_delta': round(changed_fields / deltas, 2) if deltas else 0.0,
+        'full_bytes': full_bytes, 'delta_bytes': delta_bytes,
+        'bytes_saved': full_bytes - delta_bytes,
+        'saved_pct': round(100 * (1 - delta_bytes / full_bytes), 1) if full_bytes else 0.0,
+        'max_metric_error': round(max_error, 6), 'mismatches': mismatches,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delta-encode miner_states updates")
+    parser.add_argument('--step', type=float, default=DEFAULT_STEP,
+                        help=f"metric quantization step in percent (default: {DEFAULT_STEP})")
+    parser.add_argument('--keyframe-every', type=int, default=DEFAULT_KEYFRAME_EVERY, metavar='N',
+                        help=f"frames per miner between full keyframes (default: {DEFAULT_KEYFRAME_EVERY})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('encode', "miner_states JSONL in, frame JSONL out"),
+                            ('decode', "frame JSONL in, miner_states JSONL out"),
+                            ('report', "measure bytes saved on a miner_states JSONL trace")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('input', nargs='?', default='-')
+        command.add_argument('--output', default='-')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    with source, sink:
+        if args.command == 'report':
+            sink.write(json.dumps(report(source, args.step, args.keyframe_every), indent=2) + '\n')
+        elif args.command == 'encode':
+            encoder = DeltaEncoder(args.step, args.keyframe_every)
+            sink.writelines(compact(encoder.encode(json.loads(line))) + '\n' for line in source if line.strip())
+        else:
+            decoder = DeltaDecoder(args.step)
+            for line in source:
+                if line.strip():
+                    doc = decoder.decode(json.loads(line))
+                    if doc is not None:
+                        sink.write(compact(doc) + '\n')
+
+if __name__ == "__main__":
+    main()
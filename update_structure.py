@@ -1,613 +1,1148 @@
+import argparse
+import contextlib
+import difflib
+import hashlib
+import json
 import os
+import random
+import re
+import select
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
+from common import temp_path, write_atomic
+from gpu_inventory import Inventory
+from search_index import STATUSES, SearchIndex
 
-def create_directory(path):
+MANIFEST_PATH = ".update_structure_manifest.json"
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+SEED_DATA = os.path.join(TEMPLATE_DIR, "seed", "clusters.json")
+CLUSTER_SHARD_DIR = "src/data/clusters"
+STATUS_BUCKET_DIR = "src/data/status"
+# {= name =} cannot occur in JS, JSX or CSS source, unlike {{ name }} (a JSX object literal)
+PLACEHOLDER = re.compile(r"\{= (\w+) =\}")
+# Characters escaped in generated JS strings; other controls and line separators become \uXXXX
+JS_ESCAPES = {'\\': '\\\\', "'": "\\'", '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+JS_ESCAPED = re.compile(r"[\\'\x00-\x1f\u2028\u2029]")
+IDENTIFIER = re.compile(r"^[A-Za-z_$][\w$]*$")
+
+# inotify(7) event bits we care about for template edits
+IN_MODIFY, IN_MOVED_TO, IN_CREATE, IN_DELETE, IN_CLOSE_WRITE = 0x2, 0x80, 0x100, 0x200, 0x8
+IN_MOVED_FROM, IN_DELETE_SELF = 0x40, 0x400
+
+# Writes are I/O bound, so a thread pool wider than the core count still pays off
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Per-tenant parameters a --tenants file may set, with their JSON types; the defaults
+# live on the templates
+TENANT_PARAMS = {'brandName': str, 'brandSuffix': str, 'balance': str, 'clusterTypes': list}
+# Write threads per tenant process; the process pool supplies the parallelism
+TENANT_THREADS = 4
+# --plan compares files against rendered output this many bytes at a time
+PLAN_BLOCK_SIZE = 64 * 1024
+# Items per piece when a streamed placeholder value is written out
+STREAM_ITEMS = 4096
+
+
+def content_hash(data):
+    """Return the sha256 hex digest of encoded file content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class Manifest:
+    """Size, mtime and content hash of every file written by a previous run"""
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.entries = {}
+        self.written = 0
+        self.skipped = 0
+        self.bytes_written = 0
+        self.bytes_skipped = 0
+        self.directories = 0
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError):
+                # A corrupt manifest only costs us one full rewrite
+                self.entries = {}
+
+    def is_unchanged(self, path, digest, size):
+        """Check whether path already holds content with the given digest"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if stat.st_size != size:
+            return False
+        entry = self.entries.get(path)
+        if (entry and entry['hash'] == digest and entry['size'] == stat.st_size
+                and entry['mtime_ns'] == stat.st_mtime_ns):
+            return True
+        # Stat data drifted (touched, restored from git, ...) so hash the file
+        with open(path, 'rb') as file:
+            if content_hash(file.read()) != digest:
+                return False
+        self.record(path, digest, stat)
+        return True
+
+    def record(self, path, digest, stat=None):
+        """Remember the state of a file we just wrote or verified"""
+        stat = stat or os.stat(path)
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+        with self.lock:
+            self.entries[path] = entry
+
+    def tally(self, written, size):
+        """Count one output as written or skipped"""
+        with self.lock:
+            if written:
+                self.written += 1
+                self.bytes_written += size
+            else:
+                self.skipped += 1
+                self.bytes_skipped += size
+
+    def save(self, fsync=False):
+        """Persist the manifest next to the generated tree"""
+        # Atomic, so a crash mid-save cannot leave a truncated manifest behind
+        write_atomic(self.path, json.dumps(self.entries, indent=2, sort_keys=True).encode('utf-8'), fsync,
+                     traced_fsync(self.path))
+
+    def summary(self):
+        """One line describing what this run did"""
+        summary = (f"{self.written} written ({self.bytes_written} bytes), "
+                   f"{self.skipped} unchanged ({self.bytes_skipped} bytes skipped)")
+        if self.directories:
+            summary += f", {self.directories} directories created"
+        return summary
+
+
+class Tracer:
+    """Timed spans for one run, exportable as Chrome trace events.
+
+    Disabled tracers hand out a shared no-op context, so the instrumentation
+    stays in place at negligible cost.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.events = []
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+    def span(self, name, category, **args):
+        if not self.enabled:
+            return contextlib.nullcontext(args)
+        return self.record(name, category, args)
+
+    @contextlib.contextmanager
+    def record(self, name, category, args):
+        started = time.perf_counter_ns()
+        try:
+            # Callers may add to args (e.g. the skip decision) inside the span
+            yield args
+        finally:
+            finished = time.perf_counter_ns()
+            # list.append is atomic, so worker threads need no lock here
+            self.events.append({
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': (started - self.origin) / 1000, 'dur': (finished - started) / 1000,
+                'pid': self.pid, 'tid': threading.get_ident(), 'args': args,
+            })
+
+    def write_chrome_trace(self, path):
+        """Write a trace loadable in chrome://tracing or ui.perfetto.dev"""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, file)
+
+    def file_rows(self):
+        """Per-output timings keyed by path, in milliseconds"""
+        rows = {}
+        for event in self.events:
+            path = event['args'].get('path')
+            if path is None:
+                continue
+            row = rows.setdefault(path, {'decision': '', 'bytes': 0})
+            row[event['name']] = row.get(event['name'], 0.0) + event['dur'] / 1000
+            row['decision'] = event['args'].get('decision', row['decision'])
+            row['bytes'] = event['args'].get('bytes', row['bytes'])
+        return rows
+
+    def write_file_table(self, path):
+        columns = ('render', 'check', 'write', 'fsync', 'file')
+        rows = self.file_rows()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\t'.join(('path', 'decision', 'bytes') + tuple(f"{c}_ms" for c in columns)) + '\n')
+            for output, row in sorted(rows.items(), key=lambda item: -item[1].get('file', 0)):
+                timings = (f"{row.get(column, 0.0):.3f}" for column in columns)
+                file.write('\t'.join((output, row['decision'], str(row['bytes']), *timings)) + '\n')
+
+    def totals(self):
+        """Total milliseconds and span count per span name"""
+        totals = {}
+        for event in self.events:
+            entry = totals.setdefault(event['name'], [0.0, 0])
+            entry[0] += event['dur'] / 1000
+            entry[1] += 1
+        return totals
+
+
+TRACER = Tracer()
+
+
+def create_directory(path, manifest=None):
     """Create directory if it doesn't exist"""
     if not os.path.exists(path):
-        os.makedirs(path)
-        print(f"Created directory: {path}")
-
-def create_file(path, content=""):
-    """Create file with content"""
-    with open(path, 'w', encoding='utf-8') as file:
-        file.write(content)
-    print(f"Created file: {path}")
-
-def update_structure():
-    # Create directories
-    create_directory("src/components")
-    create_directory("src/data")
-    create_directory("src/utils")
-    
-    # Update tailwind.config.js
-    create_file("tailwind.config.js", """/** @type {import('tailwindcss').Config} */
-module.exports = {
-  content: [
-    "./src/**/*.{js,jsx,ts,tsx}",
-  ],
-  theme: {
-    extend: {},
-  },
-  plugins: [],
-}""")
-    
-    # Update index.css
-    create_file("src/index.css", """@tailwind base;
-@tailwind components;
-@tailwind utilities;
-
-body {
-  margin: 0;
-  font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', 'Oxygen',
-    'Ubuntu', 'Cantarell', 'Fira Sans', 'Droid Sans', 'Helvetica Neue',
-    sans-serif;
-  -webkit-font-smoothing: antialiased;
-  -moz-osx-font-smoothing: grayscale;
-}
-
-code {
-  font-family: source-code-pro, Menlo, Monaco, Consolas, 'Courier New',
-    monospace;
-}""")
-    
-    # Create data.js
-    create_file("src/data/data.js", """// src/data/data.js
-
-export const initialClusters = [
-  {
-    status: 'Running',
-    name: 'Mega cluster testing redis',
-    timeRemaining: '68 Hrs 44 Mins',
-    gpu: { type: 'Ryzen 7000', count: 'x32' },
-    clusterType: 'Mega Cluster',
-    cpuUsage: 78,
-    memoryUsage: 65
-  },
-  {
-    status: 'Failed',
-    name: 'Testing new QTY',
-    timeRemaining: '68 Hrs 44 Mins',
-    gpu: { type: 'RTX 3090', count: 'x7' },
-    incident: true,
-    cpuUsage: 0,
-    memoryUsage: 0
-  },
-  {
-    status: 'Running',
-    name: 'TESTNET HK',
-    timeRemaining: '56 Hrs 22 Mins',
-    gpu: { type: 'RTX 4090', count: 'x2' },
-    cpuUsage: 45,
-    memoryUsage: 32
-  },
-  {
-    status: 'Failed',
-    name: 'taiwo mega cluster connectivity 1',
-    timeRemaining: '49 Hrs 23 Mins',
-    gpu: { type: 'M2 ULTRA', count: 'x55' },
-    clusterType: 'Mega Cluster',
-    incident: true,
-    cpuUsage: 0,
-    memoryUsage: 0
-  },
-  {
-    status: 'Deploying',
-    name: 'taiwo mega cluster connectivity 2',
-    timeRemaining: '12 Hrs 13 Sec',
-    gpu: { type: 'M2 ULTRA', count: 'x69' },
-    clusterType: 'Mega Cluster',
-    cpuUsage: 22,
-    memoryUsage: 18
-  },
-  {
-    status: 'Running',
-    name: 'taiwo mega cluster connectivity 3',
-    timeRemaining: '12 Hrs 21 Mins',
-    gpu: { type: 'Ryzen 7000', count: 'x1' },
-    cpuUsage: 91,
-    memoryUsage: 87
-  },
-  {
-    status: 'Deploying',
-    name: 'Latitude.sh test',
-    timeRemaining: '12 Hrs 13 Sec',
-    gpu: { type: 'M2 ULTRA', count: 'x1' },
-    cpuUsage: 12,
-    memoryUsage: 9
-  }
+        with TRACER.span('mkdir', 'directory', directory=path):
+            os.makedirs(path)
+        if manifest is not None:
+            manifest.directories += 1
+
+def traced_fsync(path):
+    """os.fsync for write_atomic that shows up as an fsync span on path"""
+    def sync(fd):
+        with TRACER.span('fsync', 'io', path=path):
+            os.fsync(fd)
+    return sync
+
+def create_file(path, content="", manifest=None, fsync=False):
+    """Create file with content, skipping it if the manifest shows it unchanged"""
+    with TRACER.span('file', 'output', path=path) as span:
+        data = content.encode('utf-8')
+        span['bytes'] = len(data)
+        with TRACER.span('check', 'skip', path=path) as check:
+            digest = content_hash(data)
+            unchanged = manifest is not None and manifest.is_unchanged(path, digest, len(data))
+            check['decision'] = span['decision'] = 'skipped' if unchanged else 'written'
+        if unchanged:
+            manifest.tally(False, len(data))
+            return False
+        with TRACER.span('write', 'io', path=path):
+            write_atomic(path, data, fsync, traced_fsync(path))
+        if manifest is not None:
+            manifest.record(path, digest)
+            manifest.tally(True, len(data))
+        return True
+
+def stream_file(path, chunks, manifest=None, fsync=False):
+    """create_file for content produced in pieces, so it is never held in memory whole.
+
+    The pieces go to a temp file while being hashed; the temp file is only
+    renamed into place when the manifest does not show the output unchanged.
+    """
+    with TRACER.span('file', 'output', path=path) as span:
+        tmp_path = temp_path(path)
+        digest, size = hashlib.sha256(), 0
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            # Rendering happens as the pieces are consumed, so it is timed as part of the write
+            with TRACER.span('write', 'io', path=path), os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    data = chunk.encode('utf-8')
+                    digest.update(data)
+                    size += len(data)
+                    file.write(data)
+            span['bytes'] = size
+            digest = digest.hexdigest()
+            with TRACER.span('check', 'skip', path=path) as check:
+                unchanged = manifest is not None and manifest.is_unchanged(path, digest, size)
+                check['decision'] = span['decision'] = 'skipped' if unchanged else 'written'
+            if unchanged:
+                os.unlink(tmp_path)
+                manifest.tally(False, size)
+                return False
+            if fsync:
+                fd = os.open(tmp_path, os.O_RDONLY)
+                try:
+                    traced_fsync(path)(fd)
+                finally:
+                    os.close(fd)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if manifest is not None:
+            manifest.record(path, digest)
+            manifest.tally(True, size)
+        return True
+
+class DiskWriter:
+    """Where generated modules go: straight to disk, recorded in the manifest.
+
+    PlanWriter has the same methods, so a dry run goes through exactly the
+    writes and removals a real run would make.
+    """
+
+    def __init__(self, manifest=None, fsync=False):
+        self.manifest = manifest
+        self.fsync = fsync
+
+    def directory(self, path):
+        create_directory(path, self.manifest)
+
+    def listdir(self, directory):
+        return os.listdir(directory)
+
+    def write(self, path, content):
+        return create_file(path, content, self.manifest, self.fsync)
+
+    def stream(self, path, chunks):
+        return stream_file(path, chunks, self.manifest, self.fsync)
+
+    def remove(self, path):
+        os.unlink(path)
+        if self.manifest is not None:
+            self.manifest.entries.pop(path, None)
+
+def create_directories(paths, manifest=None):
+    """Create the parent directories of all paths in one pass"""
+    directories = {os.path.dirname(path) for path in paths} - {''}
+    # makedirs creates intermediate levels, so only the leaves need a call
+    leaves = [d for d in directories
+              if not any(other.startswith(d + os.sep) for other in directories)]
+    for directory in sorted(leaves):
+        create_directory(directory, manifest)
+
+def emit(outputs, manifest=None, workers=None, fsync=False):
+    """Write (path, content) pairs atomically across a thread pool"""
+    outputs = list(outputs)
+    with TRACER.span('directories', 'directory'):
+        create_directories((path for path, _ in outputs), manifest)
+    with TRACER.span('emit', 'output', files=len(outputs)), \
+            ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as pool:
+        return list(pool.map(lambda item: create_file(*item, manifest=manifest, fsync=fsync),
+                             outputs))
+
+def js_literal(value, indent=0):
+    """Format a JSON-like value the way the hand-written data modules lay it out"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        escaped = JS_ESCAPED.sub(
+            lambda match: JS_ESCAPES.get(match.group(), f"\\u{ord(match.group()):04x}"), value)
+        return f"'{escaped}'"
+    pad, inner = '  ' * indent, '  ' * (indent + 1)
+    if isinstance(value, dict):
+        items = [(key if IDENTIFIER.match(key) else js_literal(key), item)
+                 for key, item in value.items()]
+        if not any(isinstance(item, (dict, list)) for _, item in items):
+            return '{ ' + ', '.join(f"{key}: {js_literal(item)}" for key, item in items) + ' }'
+        lines = [f"{inner}{key}: {js_literal(item, indent + 1)}" for key, item in items]
+        return '{\n' + ',\n'.join(lines) + f'\n{pad}}}'
+    if not any(isinstance(item, (dict, list)) for item in value):
+        return '[' + ', '.join(js_literal(item) for item in value) + ']'
+    lines = [inner + js_literal(item, indent + 1) for item in value]
+    return '[\n' + ',\n'.join(lines) + f'\n{pad}]'
+
+def js_stream(items, mapping=False):
+    """js_literal of a flat array, or of an object given as (key, value) pairs, in pieces"""
+    opening, closing = ('{ ', ' }') if mapping else ('[', ']')
+    yield opening
+    batch = []
+    for index, item in enumerate(items):
+        if mapping:
+            key, item = item
+            item = f"{key if IDENTIFIER.match(key) else js_literal(key)}: {js_literal(item)}"
+        else:
+            item = js_literal(item)
+        batch.append(f", {item}" if index else item)
+        if len(batch) == STREAM_ITEMS:
+            yield ''.join(batch)
+            batch = []
+    yield ''.join(batch) + closing
+
+def fill_placeholder_chunks(text, params):
+    """fill_placeholders in pieces; generator values (see js_stream) are passed through as they come"""
+    position = 0
+    for match in PLACEHOLDER.finditer(text):
+        yield text[position:match.start()]
+        value = params[match.group(1)]
+        # Every value is a JS literal, so no parameter can end the string or expression it sits in
+        yield from value if isinstance(value, types.GeneratorType) else (js_literal(value),)
+        position = match.end()
+    yield text[position:]
+
+def fill_placeholders(text, params):
+    """Replace {= name =} markers with their values as JS literals"""
+    return ''.join(fill_placeholder_chunks(text, params))
+
+
+class Template:
+    """An output file rendered on demand from its source under templates/"""
+
+    def __init__(self, output, seed=None, params=None, derive=None):
+        self.output = output
+        self.source = os.path.join(TEMPLATE_DIR, output + ".tmpl")
+        self.seed = os.path.join(TEMPLATE_DIR, seed) if seed else None
+        self.params = params or {}
+        # Optional function computing extra placeholder values from the seed data
+        self.derive = derive
+
+    @property
+    def name(self):
+        return self.output[len("src/"):] if self.output.startswith("src/") else self.output
+
+    @property
+    def inputs(self):
+        """Files whose contents feed into the rendered output"""
+        return [self.source] + ([self.seed] if self.seed else [])
+
+    def placeholders(self):
+        """Names of the {= name =} markers in the template source"""
+        with open(self.source, encoding='utf-8') as file:
+            return set(PLACEHOLDER.findall(file.read()))
+
+    def render(self, **params):
+        """Read the template source (and seed data) and fill in its placeholders"""
+        with TRACER.span('render', 'template', path=self.output):
+            return self.render_source(params)
+
+    def render_source(self, params):
+        return fill_placeholders(*self.source_values(params))
+
+    def render_chunks(self, **params):
+        """render() in pieces, for outputs too large to build as one string"""
+        return fill_placeholder_chunks(*self.source_values(params))
+
+    def source_values(self, params):
+        with open(self.source, encoding='utf-8') as file:
+            text = file.read()
+        values = dict(self.params)
+        if self.seed:
+            with open(self.seed, encoding='utf-8') as file:
+                values.update(json.load(file))
+        if self.derive:
+            values.update(self.derive(values))
+        values.update(params)
+        return text, values
+
+
+TEMPLATES = {template.name: template for template in (
+    Template("tailwind.config.js"),
+    Template("src/index.css"),
+    Template("src/data/data.js", seed=os.path.relpath(SEED_DATA, TEMPLATE_DIR)),
+    Template("src/data/searchIndex.js", seed=os.path.relpath(SEED_DATA, TEMPLATE_DIR),
+             derive=lambda values: SearchIndex().extend(values['initialClusters']).module_params()),
+    Template("src/data/gpuInventory.js", seed=os.path.relpath(SEED_DATA, TEMPLATE_DIR),
+             derive=lambda values: Inventory.from_clusters(
+                 values['initialClusters'], values['gpuTypes']).module_params()),
+    Template("src/utils/utils.js"),
+    Template("src/components/ActionDropdown.jsx"),
+    Template("src/components/ClusterStatsCard.jsx"),
+    Template("src/components/ClusterTable.jsx"),
+    Template("src/components/Navigation.jsx",
+             params={'brandName': 'POLARIS', 'brandSuffix': 'CLOUD', 'balance': '$USDC 17.23'}),
+    Template("src/components/StatusFilter.jsx"),
+    Template("src/App.jsx"),
+)}
+
+def select_templates(names=None):
+    """Look up templates by registry name or output path; None selects all"""
+    if not names:
+        return list(TEMPLATES.values())
+    by_output = {template.output: template for template in TEMPLATES.values()}
+    selected = []
+    for name in names:
+        template = TEMPLATES.get(name) or by_output.get(name)
+        if template is None:
+            raise KeyError(name)
+        selected.append(template)
+    return selected
+
+# Synthetic fleet shape used by the cluster generator
+STATUS_WEIGHTS = {'Running': 70, 'Deploying': 12, 'Failed': 10, 'Terminated': 8}
+NAME_WORDS = ['mega', 'cluster', 'testnet', 'latitude', 'redis', 'taiwo', 'connectivity',
+              'inference', 'training', 'qty', 'hk', 'staging', 'render', 'batch', 'edge']
+
+def generate_clusters(count, seed=0, gpu_types=None, cluster_types=None):
+    """Yield count synthetic records in the initialClusters schema, reproducible from seed"""
+    if gpu_types is None or cluster_types is None:
+        with open(SEED_DATA, encoding='utf-8') as file:
+            seed_data = json.load(file)
+        gpu_types = gpu_types or seed_data['gpuTypes']
+        cluster_types = cluster_types or seed_data['clusterTypes']
+    rng = random.Random(seed)
+    statuses, weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+    for index in range(count):
+        status = rng.choices(statuses, weights)[0]
+        record = {
+            'status': status,
+            'name': f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {index}",
+            'timeRemaining': f"{rng.randint(0, 96)} Hrs {rng.randint(0, 59)} Mins",
+            'gpu': {'type': rng.choice(gpu_types), 'count': f"x{rng.randint(1, 72)}"},
+        }
+        if rng.random() < 0.4:
+            record['clusterType'] = rng.choice(cluster_types)
+        if status in ('Failed', 'Terminated'):
+            cpu = memory = 0
+        else:
+            cpu, memory = rng.randint(1, 99), rng.randint(1, 99)
+        if status == 'Failed' or cpu > 90 or memory > 90:
+            record['incident'] = True
+        record['cpuUsage'] = cpu
+        record['memoryUsage'] = memory
+        yield record
+
+def js_record(record):
+    """Single-line JS object literal, to keep large shards compact"""
+    return '{ ' + ', '.join(f"{key}: {js_literal(value)}" for key, value in record.items()) + ' }'
+
+def render_shard(records):
+    body = ',\n'.join('  ' + js_record(record) for record in records)
+    return f"// Generated by update_structure.py; do not edit\n\nexport default [\n{body}\n];\n"
+
+def render_shard_index(total, shard_size, shard_names):
+    loaders = ',\n'.join(f"  () => import('./{name}')" for name in shard_names)
+    return f"""// Generated by update_structure.py; do not edit
+
+export const totalClusters = {total};
+export const shardSize = {shard_size};
+
+// Each shard is only fetched and parsed when its loader is called
+export const shards = [
+{loaders}
 ];
 
-// You can add more data exports here, like:
-export const gpuTypes = ['RTX 3090', 'RTX 4090', 'M2 ULTRA', 'Ryzen 7000'];
-
-export const clusterTypes = ['Standard Cluster', 'Mega Cluster'];
-
-// For usage in charts or statistics
-export const usageThresholds = {
-  low: 60,
-  high: 80
-};""")
-    
-    # Create utils.js
-    create_file("src/utils/utils.js", """// src/utils/utils.js
-
-/**
- * Get the appropriate color for a usage percentage
- * @param {number} percentage - The usage percentage
- * @returns {string} - The Tailwind CSS color class
- */
-export const getUsageColor = (percentage) => {
-  if (percentage >= 80) return 'text-red-500';
-  if (percentage >= 60) return 'text-yellow-500';
-  return 'text-green-500';
-};
-
-/**
- * Get the appropriate background color for a usage percentage
- * @param {number} percentage - The usage percentage
- * @returns {string} - The Tailwind CSS color class
- */
-export const getUsageBgColor = (percentage) => {
-  if (percentage >= 80) return 'bg-red-500';
-  if (percentage >= 60) return 'bg-yellow-500';
-  return 'bg-green-500';
-};
-
-/**
- * Get the appropriate color for a cluster status
- * @param {string} status - The cluster status
- * @returns {string} - The Tailwind CSS color class
- */
-export const getStatusColor = (status) => {
-  switch (status) {
-    case 'Running':
-      return 'bg-green-500';
-    case 'Failed':
-      return 'bg-red-500';
-    case 'Deploying':
-      return 'bg-blue-500';
-    case 'Terminated':
-      return 'bg-gray-500';
-    default:
-      return 'bg-gray-400';
-  }
-};
-
-/**
- * Format a number with commas
- * @param {number} num - The number to format
- * @returns {string} - The formatted number
- */
-export const formatNumber = (num) => {
-  return num.toString().replace(/\\B(?=(\\d{3})+(?!\\d))/g, ",");
-};
-
-/**
- * Format a date to a readable string
- * @param {Date} date - The date to format
- * @returns {string} - The formatted date
- */
-export const formatDate = (date) => {
-  return new Date(date).toLocaleDateString('en-US', {
-    year: 'numeric',
-    month: 'short',
-    day: 'numeric'
-  });
-};""")
-    
-    # Create component files
-    create_file("src/components/ActionDropdown.jsx", """import React, { useState } from 'react';
-import { MoreHorizontal, Pencil, XCircle } from 'lucide-react';
-
-const ActionDropdown = ({ onRename, onTerminate, clusterStatus, darkMode }) => {
-    const [isOpen, setIsOpen] = useState(false);
-
-    const handleDropdownClick = () => {
-        setIsOpen(!isOpen);
-    };
-
-    const handleClickOutside = () => {
-        setIsOpen(false);
-    };
-
-    return (
-        <div className="relative inline-block">
-            <button
-                onClick={handleDropdownClick}
-                className={`p-2 rounded-lg transition-colors ${darkMode ? 'hover:bg-gray-700' : 'hover:bg-gray-100'}`}
-            >
-                <MoreHorizontal className={`w-4 h-4 ${darkMode ? 'text-gray-300' : 'text-gray-600'}`} />
-            </button>
-
-            {isOpen && (
-                <>
-                    <div
-                        className="fixed inset-0 z-10"
-                        onClick={handleClickOutside}
-                    />
-                    <div className={`absolute right-0 mt-1 w-48 rounded-lg shadow-lg border z-20 py-1 ${darkMode ? 'bg-gray-800 border-gray-700' : 'bg-white border-gray-200'}`}>
-                        <button
-                            onClick={onRename}
-                            className={`w-full px-4 py-2 text-sm text-left flex items-center gap-2 ${darkMode ? 'text-gray-300 hover:bg-gray-700' : 'text-gray-700 hover:bg-gray-50'}`}
-                        >
-                            <Pencil className="w-4 h-4" strokeWidth={1.5} />
-                            Rename
-                        </button>
-                        <button
-                            onClick={onTerminate}
-                            className={`w-full px-4 py-2 text-sm text-left flex items-center gap-2 ${clusterStatus === 'Running' || clusterStatus === 'Deploying' 
-                                ? `${darkMode ? 'text-red-400 hover:bg-gray-700' : 'text-red-600 hover:bg-gray-50'}` 
-                                : `${darkMode ? 'text-gray-600 cursor-not-allowed' : 'text-gray-400 cursor-not-allowed'}`}`}
-                            disabled={clusterStatus !== 'Running' && clusterStatus !== 'Deploying'}
-                        >
-                            <XCircle className="w-4 h-4" strokeWidth={1.5} />
-                            Terminate
-                        </button>
-                    </div>
-                </>
-            )}
-        </div>
-    );
-};
-
-export default ActionDropdown;""")
-    
-    create_file("src/components/ClusterStatsCard.jsx", """import React from 'react';
-
-const ClusterStatsCard = ({ title, value, icon, darkMode }) => {
-    return (
-        <div className={`p-4 rounded-lg border ${darkMode ? 'bg-gray-800 border-gray-700' : 'bg-white border-gray-200'}`}>
-            <div className="flex items-center justify-between mb-2">
-                <h3 className={`text-sm ${darkMode ? 'text-gray-400' : 'text-gray-500'}`}>{title}</h3>
-                {icon}
-            </div>
-            <p className="text-2xl font-semibold">{value}</p>
-        </div>
-    );
-};
-
-export default ClusterStatsCard;""")
-    
-    create_file("src/components/ClusterTable.jsx", """import React from 'react';
-import ActionDropdown from './ActionDropdown';
-import { getUsageColor, getUsageBgColor, getStatusColor } from '../utils/utils';
-
-const ClusterTable = ({ filteredClusters, handleRename, handleTerminate, darkMode }) => {
-    return (
-        <div className="mt-6 overflow-x-auto">
-            <table className={`w-full min-w-[500px] border rounded-lg ${darkMode ? 'border-gray-700' : 'border-gray-200'}`}>
-                <thead className={`${darkMode ? 'bg-gray-800 text-gray-300' : 'bg-gray-50 text-gray-700'} text-sm`}>
-                    <tr>
-                        <th className="text-left p-4">Status</th>
-                        <th className="text-left p-4">Cluster Name</th>
-                        <th className="text-left p-4">Compute Hrs Remaining</th>
-                        <th className="text-left p-4">CPUs/GPUs</th>
-                        <th className="text-left p-4">Usage</th>
-                        <th className="text-left p-4"></th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {filteredClusters.map((cluster, index) => (
-                        <tr key={index} className={`${darkMode ? 'border-gray-700' : 'border-gray-200'} border-t`}>
-                            <td className="p-4">
-                                <div className="flex items-center gap-2">
-                                    <span className={`w-2 h-2 rounded-full ${getStatusColor(cluster.status)}`}></span>
-                                    <span className={`text-sm ${darkMode ? 'text-gray-300' : ''}`}>{cluster.status}</span>
-                                </div>
-                            </td>
-                            <td className="p-4">
-                                <div className="flex items-center gap-2">
-                                    <span className="text-sm">{cluster.name}</span>
-                                    {cluster.incident && (
-                                        <span className={`text-xs ${darkMode ? 'bg-red-900 text-red-200' : 'bg-red-50 text-red-500'} px-2 py-1 rounded flex items-center gap-1`}>
-                                            <span>!</span>
-                                            Ongoing Incident
-                                        </span>
-                                    )}
-                                </div>
-                            </td>
-                            <td className="p-4">{cluster.timeRemaining}</td>
-                            <td className="p-4">
-                                <div className="flex items-center gap-2">
-                                    <span className="text-sm">{cluster.gpu.type}</span>
-                                    <span className="text-xs text-gray-500">{cluster.gpu.count}</span>
-                                    {cluster.clusterType && (
-                                        <span className={`text-xs px-2 py-1 rounded ${darkMode ? 'bg-gray-700 text-gray-300' : 'bg-gray-100'}`}>
-                                            {cluster.clusterType}
-                                        </span>
-                                    )}
-                                </div>
-                            </td>
-                            <td className="p-4">
-                                {cluster.status !== 'Failed' && cluster.status !== 'Terminated' ? (
-                                    <div className="flex flex-col gap-1">
-                                        <div className="flex items-center justify-between">
-                                            <span className="text-xs">CPU</span>
-                                            <span className={`text-xs ${getUsageColor(cluster.cpuUsage)}`}>{cluster.cpuUsage}%</span>
-                                        </div>
-                                        <div className="w-full bg-gray-200 rounded-full h-1.5 dark:bg-gray-700">
-                                            <div 
-                                                className={`h-1.5 rounded-full ${getUsageBgColor(cluster.cpuUsage)}`} 
-                                                style={{ width: `${cluster.cpuUsage}%` }}
-                                            ></div>
-                                        </div>
-                                        <div className="flex items-center justify-between mt-1">
-                                            <span className="text-xs">Memory</span>
-                                            <span className={`text-xs ${getUsageColor(cluster.memoryUsage)}`}>{cluster.memoryUsage}%</span>
-                                        </div>
-                                        <div className="w-full bg-gray-200 rounded-full h-1.5 dark:bg-gray-700">
-                                            <div 
-                                                className={`h-1.5 rounded-full ${getUsageBgColor(cluster.memoryUsage)}`} 
-                                                style={{ width: `${cluster.memoryUsage}%` }}
-                                            ></div>
-                                        </div>
-                                    </div>
-                                ) : (
-                                    <span className="text-xs text-gray-500">No data available</span>
-                                )}
-                            </td>
-                            <td className="p-4">
-                                <ActionDropdown
-                                    onRename={() => handleRename(index)}
-                                    onTerminate={() => handleTerminate(index)}
-                                    clusterStatus={cluster.status}
-                                    darkMode={darkMode}
-                                />
-                            </td>
-                        </tr>
-                    ))}
-                </tbody>
-            </table>
-        </div>
-    );
-};
-
-export default ClusterTable;""")
-    
-    create_file("src/components/Navigation.jsx", """import React from 'react';
-import { Bell, Plus } from 'lucide-react';
-
-const Navigation = ({ darkMode, toggleDarkMode }) => {
-    return (
-        <nav className={`w-full border-b ${darkMode ? 'bg-gray-800 border-gray-700' : 'bg-white border-gray-200'} shadow-sm`}>
-            <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8">
-                <div className="flex justify-between h-16">
-                    <div className="flex items-center">
-                        <div className="flex-shrink-0 flex items-center">
-                            <span className="font-bold text-xl">POLARIS</span>
-                            <span className={`${darkMode ? 'text-gray-500' : 'text-gray-400'} mx-2`}>/</span>
-                            <span className={`font-medium ${darkMode ? 'text-gray-400' : 'text-gray-600'}`}>CLOUD</span>
-                        </div>
-                    </div>
-
-                    <div className="flex items-center gap-4">
-                        <div className="flex items-center gap-2">
-                            <span className={`text-sm ${darkMode ? 'text-gray-300' : 'text-gray-600'}`}>Balance:</span>
-                            <span className="text-sm font-medium">$USDC 17.23</span>
-                        </div>
-
-                        <button className={`px-4 py-1.5 border rounded-lg text-sm flex items-center gap-2 ${darkMode ? 'bg-gray-700 border-gray-600 text-gray-300 hover:bg-gray-600' : 'bg-white border-gray-200 text-gray-900 hover:bg-gray-50'}`}>
-                            Reload with Pay
-                        </button>
-
-                        <button className={`px-4 py-1.5 border rounded-lg text-sm flex items-center gap-2 ${darkMode ? 'bg-blue-600 border-blue-700 text-white hover:bg-blue-700' : 'bg-blue-500 border-blue-600 text-white hover:bg-blue-600'}`}>
-                            <Plus size={16} />
-                            Deploy Cluster
-                        </button>
-
-                        <button className={`p-1.5 rounded-lg relative ${darkMode ? 'hover:bg-gray-700' : 'hover:bg-gray-100'}`}>
-                            <Bell className={`w-5 h-5 ${darkMode ? 'text-gray-300' : 'text-gray-600'}`} />
-                            <span className="absolute top-0 right-0 w-2 h-2 bg-blue-500 rounded-full"></span>
-                        </button>
-
-                        <button 
-                            onClick={toggleDarkMode}
-                            className={`px-3 py-1 rounded-full text-xs ${darkMode ? 'bg-gray-700 text-gray-300' : 'bg-gray-200 text-gray-700'}`}
-                        >
-                            {darkMode ? 'Light' : 'Dark'}
-                        </button>
-
-                        <div className={`w-8 h-8 rounded-full flex items-center justify-center ${darkMode ? 'bg-gray-700' : 'bg-gray-200'}`}>
-                            <span className="text-sm">U</span>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </nav>
-    );
-};
-
-export default Navigation;""")
-    
-    create_file("src/components/StatusFilter.jsx", """import React from 'react';
-
-const StatusFilter = ({ statusFilter, handleStatusChange, darkMode }) => {
-    const statuses = ['Show All', 'Running', 'Failed', 'Deploying', 'Terminated'];
-    
-    return (
-        <div className="flex gap-2 text-sm overflow-x-auto">
-            {statuses.map((status) => (
-                <button
-                    key={status}
-                    className={`px-3 py-1 whitespace-nowrap rounded-full ${
-                        statusFilter === status 
-                            ? `${darkMode ? 'bg-blue-900 text-blue-200' : 'bg-blue-100 text-blue-800'}` 
-                            : `${darkMode ? 'bg-gray-700 text-gray-300' : 'bg-gray-100'}`
-                    }`}
-                    onClick={() => handleStatusChange(status)}
-                >
-                    {status}
-                </button>
-            ))}
-        </div>
-    );
-};
-
-export default StatusFilter;""")
-    
-    # Update App.js to App.jsx
-    create_file("src/App.jsx", """import React, { useState } from 'react';
-import { BarChart3, Clock, XCircle, AlertTriangle, Search } from 'lucide-react';
-
-// Import components
-import Navigation from './components/Navigation';
-import ClusterStatsCard from './components/ClusterStatsCard';
-import StatusFilter from './components/StatusFilter';
-import ClusterTable from './components/ClusterTable';
-
-// Import data from separate file
-import { initialClusters } from './data/data';
-
-function App() {
-  // State for dark mode
-  const [darkMode, setDarkMode] = useState(false);
-  
-  // Toggle dark mode function
-  const toggleDarkMode = () => {
-    setDarkMode(!darkMode);
-  };
-  
-  const [clusters, setClusters] = useState(initialClusters);
-  const [searchTerm, setSearchTerm] = useState('');
-  const [statusFilter, setStatusFilter] = useState('Show All');
-
-  // Stats calculations
-  const runningClusters = clusters.filter(c => c.status === 'Running').length;
-  const deployingClusters = clusters.filter(c => c.status === 'Deploying').length;
-  const failedClusters = clusters.filter(c => c.status === 'Failed').length;
-  const totalIncidents = clusters.filter(c => c.incident).length;
-
-  // Handlers
-  const handleSearchChange = (e) => {
-    setSearchTerm(e.target.value);
-  };
-
-  const handleStatusChange = (status) => {
-    setStatusFilter(status);
-  };
-
-  const handleTerminate = (index) => {
-    setClusters((prevClusters) =>
-      prevClusters.map((cluster, i) =>
-        i === index && (cluster.status === 'Running' || cluster.status === 'Deploying')
-          ? { ...cluster, status: 'Terminated', cpuUsage: 0, memoryUsage: 0 }
-          : cluster
-      )
-    );
-  };
-
-  const handleRename = (index) => {
-    const newName = prompt("Enter new name for the cluster:");
-    if (newName) {
-      setClusters((prevClusters) =>
-        prevClusters.map((cluster, i) =>
-          i === index ? { ...cluster, name: newName } : cluster
-        )
-      );
-    }
-  };
-
-  // Filtered clusters
-  const filteredClusters = clusters.filter(cluster => {
-    const matchesSearch = cluster.name.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesStatus = statusFilter === 'Show All' || cluster.status === statusFilter;
-    return matchesSearch && matchesStatus;
-  });
-
-  return (
-    <div className={`min-h-screen w-full ${darkMode ? 'bg-gray-900 text-white' : 'bg-gray-50 text-gray-900'}`}>
-      {/* Top Navigation */}
-      <Navigation darkMode={darkMode} toggleDarkMode={toggleDarkMode} />
-
-      <main className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">
-        {/* Dashboard Header */}
-        <div className="mb-8">
-          <h1 className="text-2xl font-bold mb-2">Compute Monitor Dashboard</h1>
-          <p className={`text-sm ${darkMode ? 'text-gray-400' : 'text-gray-600'}`}>
-            Fast, Simple, Scalable, & Accelerated GPU clusters focused on Simplicity, Speed, & Affordability.
-          </p>
-        </div>
-
-        {/* Stats Overview */}
-        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-4 mb-8">
-          <ClusterStatsCard 
-            title="Running Clusters" 
-            value={runningClusters} 
-            icon={<BarChart3 className={`w-5 h-5 ${darkMode ? 'text-green-400' : 'text-green-500'}`} />}
-            darkMode={darkMode}
-          />
-          <ClusterStatsCard 
-            title="Deploying Clusters" 
-            value={deployingClusters} 
-            icon={<Clock className={`w-5 h-5 ${darkMode ? 'text-blue-400' : 'text-blue-500'}`} />}
-            darkMode={darkMode}
-          />
-          <ClusterStatsCard 
-            title="Failed Clusters" 
-            value={failedClusters} 
-            icon={<XCircle className={`w-5 h-5 ${darkMode ? 'text-red-400' : 'text-red-500'}`} />}
-            darkMode={darkMode}
-          />
-          <ClusterStatsCard 
-            title="Active Incidents" 
-            value={totalIncidents} 
-            icon={<AlertTriangle className={`w-5 h-5 ${darkMode ? 'text-yellow-400' : 'text-yellow-500'}`} />}
-            darkMode={darkMode}
-          />
-        </div>
-
-        {/* Search and Filters */}
-        <div className={`p-4 rounded-lg mb-6 ${darkMode ? 'bg-gray-800' : 'bg-white'} shadow-sm`}>
-          <div className="space-y-4 sm:space-y-0 sm:flex sm:items-center sm:justify-between">
-            <div className={`relative flex-1 max-w-xs ${darkMode ? 'text-white' : 'text-gray-900'}`}>
-              <div className="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                <Search className="h-5 w-5 text-gray-400" />
-              </div>
-              <input
-                type="text"
-                placeholder="Search clusters..."
-                className={`block w-full pl-10 pr-3 py-2 border rounded-lg ${
-                  darkMode ? 'bg-gray-700 border-gray-600 text-white placeholder-gray-400' : 'bg-white border-gray-200 text-gray-900 placeholder-gray-500'
-                }`}
-                value={searchTerm}
-                onChange={handleSearchChange}
-              />
-            </div>
-
-            <StatusFilter 
-              statusFilter={statusFilter} 
-              handleStatusChange={handleStatusChange} 
-              darkMode={darkMode} 
-            />
-          </div>
-        </div>
-
-        {/* Clusters Table */}
-        <div className={`p-4 rounded-lg ${darkMode ? 'bg-gray-800' : 'bg-white'} shadow-sm`}>
-          <ClusterTable 
-            filteredClusters={filteredClusters}
-            handleRename={handleRename}
-            handleTerminate={handleTerminate}
-            darkMode={darkMode}
-          />
-        </div>
-      </main>
-
-      {/* Footer */}
-      <footer className={`py-4 px-8 border-t ${darkMode ? 'bg-gray-800 border-gray-700 text-gray-400' : 'bg-white border-gray-200 text-gray-500'}`}>
-        <div className="max-w-7xl mx-auto text-sm">
-          <p>© {new Date().getFullYear()} Polaris Cloud | All rights reserved</p>
-        </div>
-      </footer>
-    </div>
-  );
-}
-
-export default App;""")
-    
-    print("\nProject structure updated successfully!")
+export const loadShard = async (index) => (await shards[index]()).default;
+
+export const loadAllClusters = async () =>
+  (await Promise.all(shards.map((load) => load()))).flatMap((module) => module.default);
+"""
+
+def status_slug(status):
+    return re.sub(r'[^a-z0-9]+', '-', str(status).lower()).strip('-') or 'unknown'
+
+def render_status_part(records):
+    body = ',\n'.join('  ' + js_record(record) for record in records)
+    return f"""// Generated by update_structure.py; do not edit
+
+export const count = {len(records)};
+
+export default [
+{body}
+];
+"""
+
+def render_status_index(counts, incidents, parts):
+    buckets = ',\n'.join(
+        f"  {status if IDENTIFIER.match(status) else js_literal(status)}: [" + ', '.join(f"() => import('./{name}')" for name in names) + ']'
+        for status, names in parts.items())
+    return f"""// Generated by update_structure.py; do not edit
+
+// Enough for the stats cards without loading a single cluster row
+export const statusCounts = {js_literal(counts)};
+export const incidentCount = {incidents};
+export const totalClusters = {sum(counts.values())};
+
+// Each bucket part is only fetched and parsed when its status is selected
+const buckets = {{
+{buckets}
+}};
+
+export const loadStatus = async (status) => {{
+  const parts = status === 'Show All' ? Object.values(buckets).flat() : buckets[status] || [];
+  return (await Promise.all(parts.map((load) => load()))).flatMap((module) => module.default);
+}};
+"""
+
+
+class StatusBuckets:
+    """Cluster records split by status into part modules of at most part_size rows.
+
+    Records stream in through add(); a part is written as soon as it fills,
+    so only one part per status is held in memory. finish() writes the index
+    module with the per-status counts and a lazy loader for each bucket.
+    """
+
+    def __init__(self, out_dir, part_size=5000, prefix='', writer=None):
+        self.out_dir = out_dir
+        self.part_size = part_size
+        self.prefix = prefix
+        self.writer = writer or DiskWriter()
+        # StatusFilter order first; any other status gets a bucket of its own
+        self.pending = {status: [] for status in STATUSES}
+        self.counts = dict.fromkeys(STATUSES, 0)
+        self.parts = {status: [] for status in STATUSES}
+        self.incidents = 0
+
+    def add(self, records):
+        for record in records:
+            status = record.get('status')
+            pending = self.pending.setdefault(status, [])
+            pending.append(record)
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.incidents += bool(record.get('incident'))
+            if len(pending) >= self.part_size:
+                self.write_part(status)
+
+    def write_part(self, status):
+        parts = self.parts.setdefault(status, [])
+        name = f"{self.prefix}{status_slug(status)}-{len(parts):05d}.js"
+        path = os.path.join(self.out_dir, name)
+        with TRACER.span('render', 'template', path=path):
+            content = render_status_part(self.pending[status])
+        self.writer.write(path, content)
+        parts.append(name)
+        self.pending[status] = []
+
+    def finish(self):
+        """Write the remaining parts and the index, and drop parts from earlier runs"""
+        for status, pending in self.pending.items():
+            if pending:
+                self.write_part(status)
+        written = {name for names in self.parts.values() for name in names}
+        part_name = re.compile(rf"^{re.escape(self.prefix)}[a-z0-9-]+-\d{{5}}\.js$")
+        for name in sorted(self.writer.listdir(self.out_dir)):
+            if part_name.match(name) and name not in written:
+                self.writer.remove(os.path.join(self.out_dir, name))
+        path = os.path.join(self.out_dir, f"{self.prefix}index.js")
+        self.writer.write(path, render_status_index(self.counts, self.incidents, self.parts))
+        return path
+
+def write_seed_buckets(writer=None, out_dir=STATUS_BUCKET_DIR):
+    """Bucket the seed clusters behind data.js by status"""
+    with open(SEED_DATA, encoding='utf-8') as file:
+        clusters = json.load(file)['initialClusters']
+    writer = writer or DiskWriter()
+    writer.directory(out_dir)
+    buckets = StatusBuckets(out_dir, writer=writer)
+    buckets.add(clusters)
+    return buckets.finish()
+
+def generate_cluster_shards(count, shard_size=5000, seed=0, out_dir=CLUSTER_SHARD_DIR, writer=None):
+    """Stream synthetic clusters into fixed-size shard modules plus an index module"""
+    writer = writer or DiskWriter()
+    writer.directory(out_dir)
+    shard_names = []
+    with open(SEED_DATA, encoding='utf-8') as file:
+        gpu_types = json.load(file)['gpuTypes']
+    records = generate_clusters(count, seed)
+    search_index = SearchIndex()
+    inventory = Inventory(gpu_types)
+    status_buckets = StatusBuckets(out_dir, shard_size, 'status-', writer)
+    while True:
+        # Only one shard's worth of records is ever held in memory
+        chunk = [record for _, record in zip(range(shard_size), records)]
+        if not chunk:
+            break
+        search_index.extend(chunk)
+        for record in chunk:
+            inventory.count(record)
+        status_buckets.add(chunk)
+        name = f"shard-{len(shard_names):05d}.js"
+        path = os.path.join(out_dir, name)
+        with TRACER.span('render', 'template', path=path):
+            content = render_shard(chunk)
+        writer.write(path, content)
+        shard_names.append(name)
+
+    # Drop shards left over from an earlier, larger run
+    for name in sorted(writer.listdir(out_dir)):
+        if name.startswith('shard-') and name not in shard_names:
+            writer.remove(os.path.join(out_dir, name))
+    writer.write(os.path.join(out_dir, "index.js"), render_shard_index(count, shard_size, shard_names))
+    status_buckets.finish()
+    # Streamed straight to disk: at a few hundred thousand clusters the module
+    # is tens of megabytes
+    writer.stream(os.path.join(out_dir, "search-index.js"), TEMPLATES['data/searchIndex.js'].render_chunks(
+        count=len(search_index), names=js_stream(search_index.iter_names()),
+        statusBits=search_index.status_bits(),
+        trigrams=js_stream(search_index.iter_trigrams(), mapping=True)))
+    path = os.path.join(out_dir, "gpu-inventory.js")
+    with TRACER.span('render', 'template', path=path):
+        content = TEMPLATES['data/gpuInventory.js'].render(**inventory.module_params())
+    writer.write(path, content)
+    return shard_names
+
+def print_trace_summary(prefix):
+    """Write the trace files and print where the time went"""
+    TRACER.write_chrome_trace(f"{prefix}.trace.json")
+    TRACER.write_file_table(f"{prefix}.files.tsv")
+    print(f"\nTrace written to {prefix}.trace.json, per-file timings to {prefix}.files.tsv")
+    for name, (total, count) in sorted(TRACER.totals().items(), key=lambda item: -item[1][0]):
+        print(f"  {name:<12} {count:>7} spans {total:>10.2f} ms")
+
+def update_structure(only=None, clusters=0, shard_size=5000, seed=0, fsync=False):
+    manifest = Manifest()
+    templates = select_templates(only)
+
+    # Templates are only read and rendered when selected; emit() creates
+    # every directory up front in a single batch
+    emit(((template.output, template.render()) for template in templates), manifest, fsync=fsync)
+    if TEMPLATES['data/data.js'] in templates:
+        write_seed_buckets(DiskWriter(manifest, fsync))
+    if clusters:
+        shards = generate_cluster_shards(clusters, shard_size, seed, writer=DiskWriter(manifest, fsync))
+        print(f"Generated {clusters} clusters in {len(shards)} shards under {CLUSTER_SHARD_DIR}")
+    manifest.save(fsync)
+    print(f"\nProject structure updated: {manifest.summary()}")
     print("\nYou can now run the application with:")
     print("npm run dev")
+    return manifest
+
+def load_tenants(path):
+    """Read a JSON list of {"root": ..., <TENANT_PARAMS>...} tenant entries"""
+    with open(path, encoding='utf-8') as file:
+        tenants = json.load(file)
+    for tenant in tenants:
+        if not isinstance(tenant.get('root'), str):
+            raise ValueError(f"tenant entry without a root: {tenant!r}")
+        unknown = set(tenant) - set(TENANT_PARAMS) - {'root'}
+        if unknown:
+            raise ValueError(f"tenant {tenant['root']!r} sets unknown parameters: "
+                             f"{', '.join(sorted(unknown))}")
+        for name, value in tenant.items():
+            expected = TENANT_PARAMS.get(name)
+            if expected is list and isinstance(value, list):
+                valid = all(isinstance(item, str) for item in value)
+            else:
+                valid = expected is None or isinstance(value, expected)
+            if not valid:
+                raise ValueError(f"tenant {tenant['root']!r}: {name} must be a "
+                                 f"{'list of strings' if expected is list else 'string'}")
+    return tenants
+
+
+class RenderCache:
+    """Rendered outputs shared by every tenant whose parameters yield the same file.
+
+    A template is keyed only by the tenant parameters it actually uses, so
+    files without placeholders are rendered once for the whole fleet.
+    """
+
+    def __init__(self, templates):
+        self.templates = templates
+        self.used = {template.name: template.placeholders() for template in templates}
+        self.rendered = {}
+        self.hits = 0
+
+    def outputs(self, params):
+        """(output path, cache key) for every template, rendering on a miss"""
+        outputs = []
+        for template in self.templates:
+            relevant = {name: value for name, value in params.items() if name in self.used[template.name]}
+            key = (template.name, json.dumps(relevant, sort_keys=True))
+            if key in self.rendered:
+                self.hits += 1
+            else:
+                self.rendered[key] = template.render(**relevant)
+            outputs.append((template.output, key))
+        return outputs
+
+
+# Filled in each tenant worker process by init_tenant_worker
+RENDERED = {}
+TENANT_TOTALS = ('written', 'skipped', 'bytes_written', 'directories')
+
+def init_tenant_worker(rendered):
+    RENDERED.update(rendered)
+
+def scaffold_tenant(root, outputs, buckets=False, fsync=False):
+    """Write one tenant's tree; runs in a worker process, so chdir is local to it"""
+    os.makedirs(root, exist_ok=True)
+    os.chdir(root)
+    manifest = Manifest()
+    emit(((path, RENDERED[key]) for path, key in outputs), manifest, TENANT_THREADS, fsync)
+    if buckets:
+        # Seed data is the same for every tenant, but stale parts are per tree
+        write_seed_buckets(DiskWriter(manifest, fsync))
+    manifest.save(fsync)
+    # Manifests hold a lock, so only plain counts travel back to the parent
+    return root, manifest.summary(), {field: getattr(manifest, field) for field in TENANT_TOTALS}
+
+def scaffold_tenants(tenants, only=None, processes=None, fsync=False):
+    """Render templates once for all tenants, then write the trees across a process pool"""
+    templates = select_templates(only)
+    buckets = TEMPLATES['data/data.js'] in templates
+    cache = RenderCache(templates)
+    jobs = []
+    for tenant in tenants:
+        params = {name: value for name, value in tenant.items() if name != 'root'}
+        jobs.append((os.path.abspath(tenant['root']), cache.outputs(params)))
+    print(f"Rendered {len(cache.rendered)} distinct outputs for {len(jobs)} tenants "
+          f"({cache.hits} served from cache)")
+
+    totals = dict.fromkeys(TENANT_TOTALS, 0)
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_tenant_worker,
+                             initargs=(cache.rendered,)) as pool:
+        futures = [pool.submit(scaffold_tenant, root, outputs, buckets, fsync) for root, outputs in jobs]
+        for future in as_completed(futures):
+            root, summary, counts = future.result()
+            print(f"{os.path.relpath(root)}: {summary}")
+            for field, value in counts.items():
+                totals[field] += value
+    print(f"\nScaffolded {len(jobs)} tenants: {totals['written']} files written "
+          f"({totals['bytes_written']} bytes), {totals['skipped']} unchanged, "
+          f"{totals['directories']} directories created")
+
+
+def files_differ(path, data, block_size=PLAN_BLOCK_SIZE):
+    """Compare data with the file at path, stopping at the first differing block"""
+    try:
+        if os.path.getsize(path) != len(data):
+            return True
+    except FileNotFoundError:
+        return True
+    view = memoryview(data)
+    with open(path, 'rb') as file:
+        for offset in range(0, len(data), block_size):
+            if file.read(block_size) != view[offset:offset + block_size]:
+                return True
+    return False
+
+def diff_lines(path, old_text, new_text, deleted=False):
+    """Unified diff lines between the file on disk and its rendered content, generated lazily"""
+    for line in difflib.unified_diff(old_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                                     f"a/{path}", "/dev/null" if deleted else f"b/{path}"):
+        yield line if line.endswith('\n') else line + '\n\\ No newline at end of file\n'
+
+class PlanWriter:
+    """DiskWriter for a dry run: reports what each write or removal under root would change.
+
+    Unified diffs are streamed per file as outputs are rendered; with brief
+    set, files are only compared up to their first differing block.
+    """
+
+    def __init__(self, root='.', brief=False, out=sys.stdout):
+        self.root = root
+        self.brief = brief
+        self.out = out
+        self.counts = {'new': 0, 'modified': 0, 'unchanged': 0, 'deleted': 0}
+
+    def directory(self, path):
+        pass
+
+    def listdir(self, directory):
+        try:
+            return os.listdir(os.path.join(self.root, directory))
+        except FileNotFoundError:
+            return []
+
+    def read(self, target):
+        with open(target, encoding='utf-8', errors='replace') as file:
+            return file.read()
+
+    def report(self, status, path, lines):
+        added = removed = 0
+        for line in lines:
+            if line[0] == '+' and not line.startswith('+++'):
+                added += 1
+            elif line[0] == '-' and not line.startswith('---'):
+                removed += 1
+            self.out.write(line)
+        self.out.write(f"# {status} {path} (+{added} -{removed})\n")
+
+    def write(self, path, content):
+        target = os.path.join(self.root, path)
+        exists = os.path.exists(target)
+        if not exists:
+            status = 'new'
+        else:
+            status = 'modified' if files_differ(target, content.encode('utf-8')) else 'unchanged'
+        self.counts[status] += 1
+        if status == 'unchanged':
+            return False
+        if self.brief:
+            self.out.write(f"{status:<9} {path}\n")
+        else:
+            self.report(status, path, diff_lines(path, self.read(target) if exists else '', content))
+        return True
+
+    def remove(self, path):
+        self.counts['deleted'] += 1
+        if self.brief:
+            self.out.write(f"{'deleted':<9} {path}\n")
+        else:
+            self.report('deleted', path, diff_lines(path, self.read(os.path.join(self.root, path)), '',
+                                                    deleted=True))
+
+    def stream(self, path, chunks):
+        # The diff needs the whole text anyway
+        return self.write(path, ''.join(chunks))
+
+    @property
+    def changed(self):
+        return self.counts['new'] + self.counts['modified'] + self.counts['deleted']
+
+def plan_summary(counts):
+    summary = f"{counts['new']} new, {counts['modified']} modified, {counts['unchanged']} unchanged"
+    if counts.get('deleted'):
+        summary += f", {counts['deleted']} deleted"
+    return summary
+
+def plan(only=None, brief=False, clusters=0, shard_size=5000, seed=0):
+    """Dry run of update_structure(): every template, bucket and shard write or removal, diffed against disk"""
+    templates = select_templates(only)
+    writer = PlanWriter(brief=brief)
+    for template in templates:
+        writer.write(template.output, template.render())
+    if TEMPLATES['data/data.js'] in templates:
+        write_seed_buckets(writer)
+    if clusters:
+        generate_cluster_shards(clusters, shard_size, seed, writer=writer)
+    print(f"\nPlan: {plan_summary(writer.counts)}")
+    return writer.changed
+
+def plan_tenants(tenants, only=None, brief=False):
+    """Dry run of scaffold_tenants(), rendering each distinct output once"""
+    templates = select_templates(only)
+    cache = RenderCache(templates)
+    changed = 0
+    for tenant in tenants:
+        params = {name: value for name, value in tenant.items() if name != 'root'}
+        print(f"== {tenant['root']}")
+        writer = PlanWriter(tenant['root'], brief)
+        for path, key in cache.outputs(params):
+            writer.write(path, cache.rendered[key])
+        if TEMPLATES['data/data.js'] in templates:
+            write_seed_buckets(writer)
+        print(f"{tenant['root']}: {plan_summary(writer.counts)}")
+        changed += writer.changed
+    print(f"\nPlan: {changed} files would change across {len(tenants)} tenants")
+    return changed
+
+
+class Fingerprints:
+    """Digest of each template's inputs and params as of its last successful render"""
+
+    def __init__(self):
+        self.stats = {}
+        self.digests = {}
+        self.rendered = {}
+
+    def input_digest(self, path):
+        """Hash an input file, re-reading it only when its stat data changed"""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self.stats.get(path) != key:
+            with open(path, 'rb') as file:
+                self.digests[path] = content_hash(file.read())
+            self.stats[path] = key
+        return self.digests[path]
+
+    def current(self, template):
+        parts = [self.input_digest(path) for path in template.inputs]
+        parts.append(json.dumps(template.params, sort_keys=True))
+        return content_hash('\0'.join(parts).encode('utf-8'))
+
+    def stale(self, templates):
+        """Templates whose inputs or params differ from their last render"""
+        return [(template, digest) for template in templates
+                if (digest := self.current(template)) != self.rendered.get(template.output)]
+
+
+def template_directories():
+    return [root for root, _, _ in os.walk(TEMPLATE_DIR)]
+
+
+class InotifyWatcher:
+    """Block on inotify events for every directory under templates/"""
+
+    kind = "inotify"
+    mask = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.add_watches()
+
+    def add_watches(self):
+        # Re-adding an existing directory is a no-op, so this also picks up new ones
+        for directory in template_directories():
+            self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.mask)
+
+    def wait(self, timeout=None):
+        """Return True once events arrived, False if timeout elapsed first"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        self.add_watches()
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback that compares stat snapshots of the template tree"""
+
+    kind = "polling"
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for root, _, files in os.walk(TEMPLATE_DIR):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else deadline - time.monotonic()
+            time.sleep(max(0, min(self.interval, remaining)))
+            snapshot = self.scan()
+            if snapshot != self.snapshot:
+                self.snapshot = snapshot
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self):
+        pass
+
+
+def make_watcher(poll=False):
+    """Prefer inotify, falling back to polling where it is unavailable"""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
+
+def regenerate_stale(templates, fingerprints, fsync=False):
+    """Render and emit only the templates whose inputs changed"""
+    manifest = Manifest()
+    outputs, digests = [], {}
+    for template, digest in fingerprints.stale(templates):
+        outputs.append((template.output, template.render()))
+        digests[template.output] = digest
+    if outputs:
+        emit(outputs, manifest, fsync=fsync)
+        if TEMPLATES['data/data.js'].output in digests:
+            write_seed_buckets(DiskWriter(manifest, fsync))
+        manifest.save(fsync)
+    # Only now are the edits on disk; a failed pass leaves every template stale for the next one
+    fingerprints.rendered.update(digests)
+    return [path for path, _ in outputs], manifest
+
+def watch(only=None, debounce=0.2, poll=False, fsync=False):
+    """Keep regenerating outputs as their template inputs change"""
+    templates = select_templates(only)
+    fingerprints = Fingerprints()
+    changed, manifest = regenerate_stale(templates, fingerprints, fsync)
+    print(f"Initial render: {manifest.summary()}")
+
+    watcher = make_watcher(poll)
+    print(f"Watching {TEMPLATE_DIR} ({watcher.kind}), press Ctrl+C to stop")
+    try:
+        while True:
+            if not watcher.wait():
+                continue
+            # Editors and git checkouts touch several files at once; wait for quiet
+            while watcher.wait(debounce):
+                pass
+            try:
+                changed, manifest = regenerate_stale(templates, fingerprints, fsync)
+            except (OSError, ValueError, KeyError) as error:
+                # Usually a half-saved template or seed file; the next event retries
+                print(f"Render failed, waiting for the next change: {error!r}")
+                continue
+            if changed:
+                print(f"Regenerated {', '.join(changed)}: {manifest.summary()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaffold the dashboard sources from templates/")
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        help="regenerate just these outputs, e.g. components/ClusterTable.jsx")
+    parser.add_argument('--list', action='store_true', help="list template names and exit")
+    parser.add_argument('--watch', action='store_true',
+                        help="stay running and regenerate outputs whose templates change")
+    parser.add_argument('--poll', action='store_true', help="watch by polling instead of inotify")
+    parser.add_argument('--debounce', type=float, default=0.2, metavar='SECONDS',
+                        help="quiet period before regenerating in --watch mode (default: 0.2)")
+    parser.add_argument('--generate-clusters', type=int, default=0, metavar='N',
+                        help=f"also write N synthetic clusters as shard modules in {CLUSTER_SHARD_DIR}")
+    parser.add_argument('--shard-size', type=int, default=5000, metavar='N',
+                        help="clusters per generated shard module (default: 5000)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed for generated clusters (default: 0)")
+    parser.add_argument('--fsync', action='store_true',
+                        help="fsync each written file before moving it into place")
+    parser.add_argument('--tenants', metavar='FILE',
+                        help="scaffold every root listed in this JSON file, with its own "
+                             f"{', '.join(TENANT_PARAMS)}")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="worker processes for --tenants (default: one per CPU)")
+    parser.add_argument('--plan', action='store_true',
+                        help="render and diff against disk without writing; exits 1 if anything would change")
+    parser.add_argument('--brief', action='store_true',
+                        help="with --plan, only list the files that would change")
+    parser.add_argument('--trace', nargs='?', const='update_structure', metavar='PREFIX',
+                        help="record spans to PREFIX.trace.json (Chrome trace) and PREFIX.files.tsv")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, template in TEMPLATES.items():
+            print(f"{name:<36} -> {template.output}")
+        return
+    try:
+        select_templates(args.only)
+    except KeyError as error:
+        parser.error(f"unknown template {error.args[0]!r} (see --list)")
+    if args.brief and not args.plan:
+        parser.error("--brief only applies to --plan")
+    if args.plan and args.watch:
+        parser.error("--plan cannot be combined with --watch")
+    if args.watch and args.generate_clusters:
+        parser.error("--watch only follows templates; run --generate-clusters separately")
+    if args.tenants:
+        if args.watch or args.generate_clusters or args.trace:
+            parser.error("--tenants cannot be combined with --watch, --generate-clusters or --trace")
+        try:
+            tenants = load_tenants(args.tenants)
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+        if args.plan:
+            return 1 if plan_tenants(tenants, args.only, args.brief) else 0
+        scaffold_tenants(tenants, args.only, args.processes, args.fsync)
+        return
+    TRACER.enabled = bool(args.trace)
+    if args.plan:
+        changed = plan(args.only, args.brief, args.generate_clusters, args.shard_size, args.seed)
+        if args.trace:
+            print_trace_summary(args.trace)
+        return 1 if changed else 0
+    if args.watch:
+        watch(args.only, args.debounce, args.poll, args.fsync)
+    else:
+        update_structure(args.only, args.generate_clusters, args.shard_size, args.seed, args.fsync)
+    if args.trace:
+        print_trace_summary(args.trace)
 
 if __name__ == "__main__":
-    update_structure()    
\ No newline at end of file
+    sys.exit(main())
@@ -4,4 +4,6 @@ import react from '@vitejs/plugin-react'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
+  // dist/.vite/manifest.json tells postbuild.py which files carry a content hash
+  build: { manifest: true },
 })